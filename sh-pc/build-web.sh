@@ -0,0 +1,8 @@
+#!/bin/bash
+# 预压缩web目录下的静态文件，http服务在浏览器支持gzip时直接发送.gz文件
+cd "$(dirname "$0")/../src/web"
+for f in *.html *.js *.css; do
+  if [ -f "$f" ]; then
+    gzip -9 -n -k -f "$f"
+  fi
+done
\ No newline at end of file
@@ -0,0 +1,281 @@
+import os
+import asyncio
+from errno import EAGAIN, ETIMEDOUT
+from adafruit_ticks import ticks_ms, ticks_diff
+import adafruit_httpserver
+import socket_ready
+from adafruit_httpserver.request import Request
+from adafruit_httpserver.response import Response, FileResponse
+from adafruit_httpserver.status import Status, SERVICE_UNAVAILABLE_503
+from adafruit_httpserver.mime_types import MIMETypes
+from adafruit_httpserver.route import _Route
+
+_MAX_CONNECTIONS = 4
+# 事件流长期占用连接，限制数量保证普通请求仍有空闲连接
+_MAX_STREAMS = 2
+_REQUEST_TIMEOUT_MS = 3000
+_SEND_TIMEOUT_MS = 3000
+_MAX_HEADER_SIZE = 4096
+_MAX_BODY_SIZE = 4096
+_BUFFER_SIZE = 1024
+_FILE_BUFFER_SIZE = 2048
+
+NOT_MODIFIED_304 = Status(304, "Not Modified")
+
+# AsyncHttpServer用到adafruit_httpserver的内部接口（路由查找、Response._send、FileResponse的文件属性），
+# 只适配lib目录中随项目发布的4.1.0版本，版本不一致时http_server退回到库自带的Server.poll轮询
+HTTPSERVER_VERSION = "4.1.0"
+
+
+def supported() -> bool:
+    return adafruit_httpserver.__version__ == HTTPSERVER_VERSION
+
+# 静态文件路径 -> (ETag, 是否存在.gz预压缩文件)，文件更新后设备会重启，缓存无需失效
+_static_files = dict()
+
+
+def _static_info(path: str):
+    info = _static_files.get(path)
+    if info == None:
+        st = os.stat(path)
+        tag = "{:x}-{:x}".format(st[6], st[8])
+        gz = False
+        try:
+            # 预压缩文件比源文件旧时说明没有重新生成，忽略
+            gz = os.stat(path + ".gz")[8] >= st[8]
+        except OSError:
+            pass
+        info = (tag, gz)
+        _static_files[path] = info
+    return info
+
+
+def static_file(request: Request, filename: str, root_path: str, max_age: int = 0):
+    # 客户端支持gzip且存在预压缩文件时发送.gz；ETag命中返回304；max_age为0时浏览器每次校验ETag
+    try:
+        tag, gz = _static_info(FileResponse._combine_path(root_path, filename))
+    except OSError:
+        return FileResponse(request, filename=filename, root_path=root_path)
+    gz = gz and "gzip" in request.headers.get("Accept-Encoding", "")
+    tag = '"{}{}"'.format(tag, "-gz" if gz else "")
+    headers = dict({"ETag": tag, "Vary": "Accept-Encoding"})
+    if max_age > 0:
+        headers["Cache-Control"] = "public, max-age={}".format(max_age)
+    else:
+        headers["Cache-Control"] = "no-cache"
+    if tag in request.headers.get("If-None-Match", ""):
+        return Response(request, status=NOT_MODIFIED_304, headers=headers)
+    content_type = MIMETypes.get_for_filename(filename)
+    if gz:
+        headers["Content-Encoding"] = "gzip"
+        filename += ".gz"
+    return FileResponse(request, filename=filename, root_path=root_path, headers=headers,
+                        content_type=content_type, buffer_size=_FILE_BUFFER_SIZE)
+
+
+class ConnectionWriter(object):
+    # 作为Request.connection交给adafruit_httpserver的Response使用，同步写入的数据先缓存，再由drain异步发送
+    def __init__(self, conn):
+        self._conn = conn
+        self._pending = []
+
+    def send(self, data) -> int:
+        self._pending.append(bytes(data))
+        return len(data)
+
+    async def drain(self):
+        pending = self._pending
+        self._pending = []
+        for data in pending:
+            await self._send_all(data)
+
+    async def write(self, data):
+        self.send(data)
+        await self.drain()
+
+    async def _send_all(self, data):
+        view = memoryview(data)
+        sent = 0
+        start = ticks_ms()
+        while sent < len(data):
+            try:
+                sent += self._conn.send(view[sent:])
+                start = ticks_ms()
+                continue
+            except OSError as e:
+                if e.errno != EAGAIN:
+                    raise e
+            remain = _SEND_TIMEOUT_MS - ticks_diff(ticks_ms(), start)
+            if remain <= 0 or not await socket_ready.wait_writable(self._conn, remain):
+                # 超时取消等待时IOQueue会移除该socket上的全部等待（包括等待读的任务），连接已无法继续使用，直接关闭
+                self._conn.close()
+                raise OSError(ETIMEDOUT)
+
+
+class EventStream(Response):
+    # Server-Sent Events响应，连接保持打开，由producer(stream)循环调用send推送事件，客户端断开后send抛出OSError结束
+    def __init__(self, request: Request, producer):
+        super().__init__(request, headers={"Cache-Control": "no-cache"}, content_type="text/event-stream")
+        self._producer = producer
+
+    async def run(self):
+        self._send_headers()
+        await self._request.connection.drain()
+        await self._producer(self)
+
+    async def send(self, data: str, event: str = None):
+        msg = ""
+        if event != None:
+            msg += "event: {}\n".format(event)
+        msg += "data: {}\n\n".format(data)
+        await self._request.connection.write(msg.encode("utf-8"))
+
+    async def heartbeat(self):
+        await self._request.connection.write(b":\n\n")
+
+
+class AsyncHttpServer(object):
+    def __init__(self, server):
+        self._server = server
+        self._active = 0
+        self._streams = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def start(self, host: str, port: int = 80):
+        self._server.start(host, port)
+
+    async def serve(self):
+        sock = self._server._sock
+        while not self._server.stopped:
+            await socket_ready.wait_readable(sock)
+            try:
+                conn, addr = sock.accept()
+            except OSError:
+                continue
+            if self._active >= _MAX_CONNECTIONS:
+                self.rejected += 1
+                conn.close()
+                continue
+            conn.setblocking(False)
+            self._active += 1
+            asyncio.create_task(self._handle(conn, addr))
+
+    async def _handle(self, conn, addr):
+        try:
+            try:
+                request = await asyncio.wait_for_ms(self._receive_request(conn, addr), _REQUEST_TIMEOUT_MS)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return
+            if request == None:
+                return
+            self.requests += 1
+            handler = self._server._routes.find_handler(_Route(request.path, request.method))
+            response = self._server._handle_request(request, handler)
+            if response == None:
+                return
+            self._server._set_default_server_headers(response)
+            await self._send(response, request.connection)
+        except Exception as e:
+            print("HTTP请求处理失败：{}".format(e))
+        finally:
+            self._active -= 1
+            conn.close()
+
+    async def _recv(self, conn, buf) -> int:
+        while True:
+            try:
+                return conn.recv_into(buf, len(buf))
+            except OSError as e:
+                if e.errno != EAGAIN:
+                    raise e
+            await socket_ready.wait_readable(conn)
+
+    async def _receive_request(self, conn, addr):
+        buf = bytearray(_BUFFER_SIZE)
+        data = b""
+        while data.find(b"\r\n\r\n") < 0:
+            if len(data) > _MAX_HEADER_SIZE:
+                return None
+            size = await self._recv(conn, buf)
+            if size == 0:
+                return None
+            data += buf[:size]
+        request = Request(self._server, ConnectionWriter(conn), addr, data)
+        length = int(request.headers.get("Content-Length", 0))
+        if length > _MAX_BODY_SIZE:
+            return None
+        body = request.body
+        while len(body) < length:
+            size = await self._recv(conn, buf)
+            if size == 0:
+                break
+            body += buf[:size]
+        request.body = body[:length]
+        return request
+
+    async def _send(self, response, writer: ConnectionWriter):
+        if isinstance(response, EventStream):
+            await self._stream(response, writer)
+            return
+        if isinstance(response, FileResponse):
+            # 文件分块读取，每块发送完再读下一块，不把整个文件放进内存
+            response._send_headers(response._file_length, response._content_type)
+            await writer.drain()
+            if response._head_only:
+                return
+            with open(response._full_file_path, "rb") as f:
+                while True:
+                    chunk = f.read(response._buffer_size)
+                    if not chunk:
+                        break
+                    await writer.write(chunk)
+            return
+        response._send()
+        await writer.drain()
+
+    async def _stream(self, response: EventStream, writer: ConnectionWriter):
+        if self._streams >= _MAX_STREAMS:
+            response = Response(response._request, "", status=SERVICE_UNAVAILABLE_503)
+            self._server._set_default_server_headers(response)
+            response._send()
+            await writer.drain()
+            return
+        self._streams += 1
+        task = asyncio.create_task(self._run_stream(response))
+        watcher = asyncio.create_task(self._watch_close(writer._conn, task))
+        try:
+            # 推送结束（客户端断开、发送超时或出错）后释放连接
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            watcher.cancel()
+            self._streams -= 1
+
+    async def _watch_close(self, conn, task):
+        # 事件流期间客户端不再发送数据，连接可读即表示已断开，立即结束推送
+        buf = bytearray(16)
+        try:
+            while await self._recv(conn, buf) > 0:
+                pass
+        except OSError:
+            pass
+        task.cancel()
+
+    async def _run_stream(self, response: EventStream):
+        try:
+            await response.run()
+        except (OSError, asyncio.TimeoutError):
+            pass
+
+    def info(self) -> dict:
+        return dict({
+            "active": self._active,
+            "streams": self._streams,
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+        })
@@ -0,0 +1,97 @@
+import time
+import asyncio
+from errno import EAGAIN
+import wifi
+import http_server
+import socket_ready
+from async_http import AsyncHttpServer
+
+_PORT = 8080
+_ROUNDS = 20
+_REQUESTS = (
+    ("GET", "/status", b""),
+    ("POST", "/macro/start", b'{"stats":"timing"}'),
+)
+
+
+async def _legacy_serve(server):
+    # 旧版serve()：阻塞poll后固定等待50ms，仅用于对比
+    while True:
+        try:
+            server.poll()
+        except OSError:
+            pass
+        await asyncio.sleep_ms(50)
+
+
+async def _request(host: str, port: int, method: str, path: str, body: bytes) -> int:
+    pool = http_server._pool
+    sock = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+    t = time.monotonic_ns()
+    sock.connect((host, port))
+    sock.setblocking(False)
+    head = "{} {} HTTP/1.1\r\nHost: {}\r\nContent-Length: {}\r\n\r\n".format(method, path, host, len(body))
+    data = memoryview(head.encode("utf-8") + body)
+    sent = 0
+    while sent < len(data):
+        try:
+            sent += sock.send(data[sent:])
+        except OSError as e:
+            if e.errno != EAGAIN:
+                raise e
+            await socket_ready.wait_writable(sock)
+    buf = bytearray(1024)
+    while True:
+        try:
+            if sock.recv_into(buf, len(buf)) == 0:
+                break
+        except OSError as e:
+            if e.errno != EAGAIN:
+                break
+            await socket_ready.wait_readable(sock)
+    span = time.monotonic_ns() - t
+    sock.close()
+    return span
+
+
+async def _measure(host: str, port: int):
+    ret = []
+    for method, path, body in _REQUESTS:
+        spans = []
+        for i in range(_ROUNDS):
+            spans.append(await _request(host, port, method, path, body))
+            await asyncio.sleep_ms(5)
+        spans.sort()
+        ret.append((path, spans[len(spans) // 2], spans[len(spans) - 1]))
+    return ret
+
+
+def _print(tag: str, result):
+    for path, median, worst in result:
+        print("{} {}：中位数 {:.1f}ms，最大 {:.1f}ms".format(tag, path, median / 1000000, worst / 1000000))
+
+
+async def _run():
+    host = str(wifi.radio.ipv4_address)
+    server = http_server._server
+
+    server.start(host, _PORT)
+    task = asyncio.create_task(_legacy_serve(server))
+    _print("轮询", await _measure(host, _PORT))
+    task.cancel()
+    server.stop()
+
+    async_server = AsyncHttpServer(server)
+    async_server.start(host, _PORT + 1)
+    task = asyncio.create_task(async_server.serve())
+    # 固件不支持poll时AsyncHttpServer退回为10ms轮询，结果按实际方式标注
+    tag = "事件驱动"
+    if not socket_ready.pollable(server._sock):
+        tag = "AsyncHttpServer（不支持poll，10ms轮询）"
+    _print(tag, await _measure(host, _PORT + 1))
+    task.cancel()
+    server.stop()
+
+
+def run():
+    asyncio.run(_run())
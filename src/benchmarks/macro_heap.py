@@ -0,0 +1,79 @@
+import gc
+import time
+from macros import macro, node
+
+_FILE = "/resources/macros/pokemon/scarletviolet/eggs.m"
+
+
+class _LinkedNode(object):
+    # 旧版node.Node链表结构，仅用于对比
+    def __init__(self, action_line: str):
+        self._head = self
+        self._next = None
+        self._action_line = action_line
+
+    def append(self, action_line: str):
+        n = self
+        while n._next != None:
+            n = n._next
+        n._next = _LinkedNode(action_line)
+        n._next._head = n._head
+        return n._next
+
+
+def _build_linked(dic: dict) -> dict:
+    ret = dict()
+    for key in dic.keys():
+        n = None
+        for row in dic[key]:
+            if n == None:
+                n = _LinkedNode(row)
+            else:
+                n = n.append(row)
+        ret[key] = n._head
+    return ret
+
+
+def _build_array(dic: dict) -> dict:
+    ret = dict()
+    strings = node.Pool()
+    for key in dic.keys():
+        code = node.Node(strings)
+        for row in dic[key]:
+            code.append_row(row)
+        ret[key] = code
+    strings.seal()
+    return ret
+
+
+def _heap_used() -> int:
+    gc.collect()
+    try:
+        return -gc.mem_free()
+    except AttributeError:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _measure(build, dic: dict):
+    _heap_used()
+    before = _heap_used()
+    t = time.monotonic_ns()
+    ret = build(dic)
+    span = time.monotonic_ns() - t
+    used = _heap_used() - before
+    ret = None
+    return used, span
+
+
+def run(filename: str = _FILE):
+    dic = macro.Macro()._parse_file(filename)[0]
+    lines = 0
+    for key in dic.keys():
+        lines += len(dic[key])
+    print("{}：{}个宏，{}行".format(filename, len(dic), lines))
+    for tag, build in (("链表", _build_linked), ("数组", _build_array)):
+        used, span = _measure(build, dic)
+        print("{}：占用内存 {:.2f}KB，构建耗时 {:.2f}ms".format(tag, used / 1024, span / 1000000))
@@ -0,0 +1,125 @@
+import io
+import time
+import asyncio
+from asyncio import core
+from errno import EAGAIN
+import socket_ready
+from tcp_server import TcpServer
+
+_WINDOW_MS = 2000
+_CLIENTS = (1, 4, 16)
+_PORT = 5999
+
+
+async def _legacy_handler(client_socket):
+    # 旧版tcp_handler的轮询方式：每1ms唤醒一次并新建BytesIO，仅用于对比
+    buf = bytearray(1024)
+    while True:
+        await asyncio.sleep_ms(1)
+        bytes_io = io.BytesIO()
+        while True:
+            try:
+                size = client_socket.recv_into(buf, 1024)
+                bytes_io.write(buf[:size])
+            except OSError as e:
+                if e.errno == EAGAIN:
+                    break
+                raise e
+        bytes_io.close()
+
+
+def _connect_pairs(n: int) -> list:
+    try:
+        import wifi
+        import socketpool
+    except ImportError:
+        import socket
+        pairs = []
+        for i in range(n):
+            pairs.append(socket.socketpair())
+        return pairs
+    pool = socketpool.SocketPool(wifi.radio)
+    host = str(wifi.radio.ipv4_address)
+    server = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+    server.bind((host, _PORT))
+    server.listen(n)
+    pairs = []
+    try:
+        for i in range(n):
+            client = pool.socket(pool.AF_INET, pool.SOCK_STREAM)
+            client.connect((host, _PORT))
+            pairs.append((server.accept()[0], client))
+    finally:
+        server.close()
+    return pairs
+
+
+class _IdleMeter(object):
+    # 统计事件循环阻塞在poll上的时间（CPU空闲时间）和阻塞等待的次数（唤醒次数），
+    # 不支持poll时的10ms轮询和旧版的1ms轮询都是阻塞等待后被唤醒，同样计入
+    def __init__(self):
+        self.idle_ns = 0
+        self.wakeups = 0
+        queue = core._io_queue
+        wait = queue.wait_io_event
+
+        def timed_wait(dt):
+            if dt != 0:
+                self.wakeups += 1
+            t = time.monotonic_ns()
+            wait(dt)
+            self.idle_ns += time.monotonic_ns() - t
+        queue.wait_io_event = timed_wait
+
+    async def measure(self, ms: int):
+        # 返回(空闲百分比, 每秒唤醒次数)，测量窗口本身的一次等待不计入
+        self.idle_ns = 0
+        self.wakeups = 0
+        t = time.monotonic_ns()
+        await asyncio.sleep_ms(ms)
+        span = time.monotonic_ns() - t
+        return self.idle_ns * 100 / span, (self.wakeups - 1) * 1000000000 / span
+
+
+async def _measure(meter, handler, n: int):
+    pairs = _connect_pairs(n)
+    tasks = []
+    for pair in pairs:
+        pair[0].setblocking(False)
+        tasks.append(asyncio.create_task(handler(pair[0])))
+    await asyncio.sleep_ms(10)
+    idle = await meter.measure(_WINDOW_MS)
+    for task in tasks:
+        task.cancel()
+    await asyncio.sleep_ms(10)
+    for pair in pairs:
+        pair[0].close()
+        pair[1].close()
+    return idle
+
+
+async def _run():
+    server = TcpServer()
+    meter = _IdleMeter()
+    pair = _connect_pairs(1)[0]
+    if socket_ready.pollable(pair[0]):
+        print("当前模式：socket支持poll，tcp_handler在socket可读时才被唤醒")
+    else:
+        print("当前模式：socket不支持poll，tcp_handler退回为每{}ms轮询".format(socket_ready._Poll_Interval_ms))
+    pair[0].close()
+    pair[1].close()
+    idle, wakeups = await meter.measure(_WINDOW_MS)
+    print("无连接：CPU空闲 {:.1f}%，每秒唤醒 {:.0f}次".format(idle, wakeups))
+    for n in _CLIENTS:
+        try:
+            legacy = await _measure(meter, _legacy_handler, n)
+            current = await _measure(meter, server.tcp_handler, n)
+        except OSError as e:
+            print("{}个连接：无法创建socket（{}）".format(n, e))
+            continue
+        print("{}个连接：旧版轮询 CPU空闲 {:.1f}%，每秒唤醒 {:.0f}次；当前 CPU空闲 {:.1f}%，每秒唤醒 {:.0f}次".format(
+            n, legacy[0], legacy[1], current[0], current[1]))
+
+
+def run():
+    asyncio.run(_run())
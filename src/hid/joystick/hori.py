@@ -1,10 +1,17 @@
 import time
 import asyncio
 from hid.joystick.input.hori import JoyStickInput_HORI_S
+from hid.joystick.input.joystick_input import LineCache
 from hid.joystick.joystick import JoyStick
+from hid.joystick.timing import Timing, parse_chain
 import hid.device
 
 _Mini_Key_Send_Span_ns = 3000000
+_Report_Cache_Size = 32
+_Chain_Cache_Size = 64
+
+def _encode_report(action_line: str):
+    return bytes(JoyStickInput_HORI_S(action_line).buffer())
 
 class JoyStick_HORI_S(JoyStick):
     def __new__(cls, *args, **kwargs):
@@ -19,11 +26,13 @@ class JoyStick_HORI_S(JoyStick):
             JoyStick_HORI_S._first = False
             device = hid.device.get_device(hid.device.Device_HORIPAD_S)
             self._joystick_device = device.find_device()
-            self._last_send_monotonic_ns = 0
+            self._timing = Timing(_Mini_Key_Send_Span_ns)
             self._realtime_data_lock = asyncio.Lock()
             self._is_realtime = False
             self._realtime_action = ""
             self._realtime_task = None
+            self._report_cache = LineCache(_encode_report, _Report_Cache_Size)
+            self._chain_cache = LineCache(self._parse_chain, _Chain_Cache_Size)
             try:
                 self._sync_release()
             except OSError:
@@ -31,44 +40,18 @@ class JoyStick_HORI_S(JoyStick):
                 self._sync_release()
 
     def _sync_release(self):
-        self._sync_send(JoyStickInput_HORI_S(""))
+        self._sync_send(self._report_cache.get(""))
 
-    def _sync_send(self,input:JoyStickInput_HORI_S):
-        self._joystick_device.send_report(input.buffer())
-        self._last_send_monotonic_ns = time.monotonic_ns()
+    def _sync_send(self,report:bytes):
+        self._joystick_device.send_report(report)
+        self._timing.last_send_ns = time.monotonic_ns()
 
     async def _send(self,  input_line: str = "",earliest_send_key_monotonic_ns=0):
-        earliest = self._last_send_monotonic_ns + _Mini_Key_Send_Span_ns
-        if earliest < earliest_send_key_monotonic_ns:
-            earliest = earliest_send_key_monotonic_ns
-        input = JoyStickInput_HORI_S(input_line)
-        loop = 0
-        while True:
-            loop += 1
-            now = time.monotonic_ns()
-            if now >= earliest:
-                break
-            elif now < earliest - _Mini_Key_Send_Span_ns:
-                ms = int((earliest - now  - _Mini_Key_Send_Span_ns)/1000000)
-                await asyncio.sleep_ms(ms)
-            else:
-                time.sleep(0.0001)
-        t1 = time.monotonic_ns()
-        self._sync_send(input)
-        t2 = time.monotonic_ns()
-        # print((t2 - t1)/1000000,(t1 - earliest)/1000000,loop,input_line)
-
-    async def _key_press(self,  inputs = []):
-        last_action = ""
-        release_monotonic_ns = 0
-        for input_line in inputs:
-            last_action = input_line
-            if input_line == "~":
-                continue
-            await self._send(input_line[0],release_monotonic_ns)
-            release_monotonic_ns = self._last_send_monotonic_ns + input_line[1]*1000000000
-        if last_action != "~":
-            await self.release(release_monotonic_ns)
+        await self._timing.wait_until(earliest_send_key_monotonic_ns)
+        await self._timing.play(self._sync_send, ((self._report_cache.get(input_line), 0),))
+
+    def _parse_chain(self, action_line: str):
+        return parse_chain(action_line, self._report_cache.get)
 
     async def _start_realtime_async(self):
         async with self._realtime_data_lock:
@@ -105,27 +88,17 @@ class JoyStick_HORI_S(JoyStick):
         await self._send("",release_monotonic_ns)
 
     async def do_action(self,  action_line: str = ""):
-        inputs = []
-        actions = action_line.split("->")
-        for action in actions:
-            splits = action.split(":")
-            if len(splits) > 2:
-                continue
-            p1 = splits[0]
-            p2 = 0.1
-            if len(splits) == 1:
-                try:
-                    p2 = float(splits[0])
-                    p1 = ""
-                except:
-                    pass
-            else:
-                try:
-                    p2 = float(splits[1])
-                except:
-                    pass
-            inputs.append((p1,p2))
-        await self._key_press(inputs)
+        await self._timing.play(self._sync_send, self._chain_cache.get(action_line))
+
+    def stats(self) -> dict:
+        return dict({
+            "report_cache": self._report_cache.info(),
+            "chain_cache": self._chain_cache.info(),
+            "timing": self._timing.info(),
+        })
+
+    def reset_stats(self):
+        self._timing.reset()
 
     def start_realtime(self):
         if self._realtime_task:
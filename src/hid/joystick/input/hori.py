@@ -1,4 +1,4 @@
-from hid.joystick.input.joystick_input import JoyStickInput
+from hid.joystick.input.joystick_input import JoyStickInput, compile_profile, STICK_U8
 
 _Input0_Y = 0b1
 _Input0_B = 0b10
@@ -26,119 +26,40 @@ _Input2_DPadLeft = 6
 _Input2_DPadTopLeft = 7
 _Input2_DPadCenter = 8
 
-class JoyStickInput_HORI_S(JoyStickInput):
-    def __init__(self, input_line):
-        self._buffer = bytearray(8)
-        self._buffer[2] = _Input2_DPadCenter
-        self._buffer[3] = 128
-        self._buffer[4] = 128
-        self._buffer[5] = 128
-        self._buffer[6] = 128
-
-        splits = input_line.upper().split("|", -1)
-        for s in splits:
-            s = s.strip()
-            if s == "Y":
-                self._buffer[0] |= _Input0_Y
-            elif s == "B":
-                self._buffer[0] |= _Input0_B
-            elif s == "X":
-                self._buffer[0] |= _Input0_X
-            elif s == "A":
-                self._buffer[0] |= _Input0_A
-            elif s == "L":
-                self._buffer[0] |= _Input0_L
-            elif s == "R":
-                self._buffer[0] |= _Input0_R
-            elif s == "ZL":
-                self._buffer[0] |= _Input0_ZL
-            elif s == "ZR":
-                self._buffer[0] |= _Input0_ZR
-            elif s == "MINUS":
-                self._buffer[1] |= _Input1_Minus
-            elif s == "PLUS":
-                self._buffer[1] |= _Input1_Plus
-            elif s == "LPRESS":
-                self._buffer[1] |= _Input1_LPress
-            elif s == "RPRESS":
-                self._buffer[1] |= _Input1_RPress
-            elif s == "HOME":
-                self._buffer[1] |= _Input1_Home
-            elif s == "CAPTURE":
-                self._buffer[1] |= _Input1_Capture
-            elif s == "CENTER":
-                self._buffer[2] = _Input2_DPadCenter
-            elif s == "TOP":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadTop
-            elif s == "TOPRIGHT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadTopRight
-            elif s == "RIGHT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadRight
-            elif s == "BOTTOMRIGHT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadBottomRight
-            elif s == "BOTTOM":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadBottom
-            elif s == "BOTTOMLEFT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadBottomLeft
-            elif s == "LEFT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadLeft
-            elif s == "TOPLEFT":
-                if self._buffer[2] != _Input2_DPadCenter:
-                    self._buffer[2] = _Input2_DPadCenter
-                else:
-                    self._buffer[2] = _Input2_DPadTopLeft
-            else:
-                stick = s.split("@", -1)
-                if len(stick) == 2:
-                    x = 0
-                    y = 0
-                    coordinate = stick[1].split(",", -1)
-                    if len(coordinate) == 2:
-                        x = self._coordinate_str_convert_int(coordinate[0])
-                        y = self._coordinate_str_convert_int(coordinate[1])
-                    x += 128
-                    y += 128
-                    if stick[0] == "LSTICK":
-                        if self._buffer[3] == 128 and self._buffer[4] == 128:
-                            self._buffer[3] = x
-                            self._buffer[4] = y
-                    elif stick[0] == "RSTICK":
-                        if self._buffer[5] == 128 and self._buffer[6] == 128:
-                            self._buffer[5] = x
-                            self._buffer[6] = y
+PROFILE = dict({
+    "default": bytes([0, 0, _Input2_DPadCenter, 128, 128, 128, 128, 0]),
+    "buttons": {
+        "Y": (0, _Input0_Y),
+        "B": (0, _Input0_B),
+        "X": (0, _Input0_X),
+        "A": (0, _Input0_A),
+        "L": (0, _Input0_L),
+        "R": (0, _Input0_R),
+        "ZL": (0, _Input0_ZL),
+        "ZR": (0, _Input0_ZR),
+        "MINUS": (1, _Input1_Minus),
+        "PLUS": (1, _Input1_Plus),
+        "LPRESS": (1, _Input1_LPress),
+        "RPRESS": (1, _Input1_RPress),
+        "HOME": (1, _Input1_Home),
+        "CAPTURE": (1, _Input1_Capture),
+    },
+    "hat": (2, _Input2_DPadCenter, {
+        "TOP": _Input2_DPadTop,
+        "TOPRIGHT": _Input2_DPadTopRight,
+        "RIGHT": _Input2_DPadRight,
+        "BOTTOMRIGHT": _Input2_DPadBottomRight,
+        "BOTTOM": _Input2_DPadBottom,
+        "BOTTOMLEFT": _Input2_DPadBottomLeft,
+        "LEFT": _Input2_DPadLeft,
+        "TOPLEFT": _Input2_DPadTopLeft,
+    }),
+    "sticks": {
+        "LSTICK": (STICK_U8, 3),
+        "RSTICK": (STICK_U8, 5),
+    },
+})
 
-    def _coordinate_str_convert_int(self, str):
-        v = 0
-        try:
-            v = int(float(str))
-        except:
-            pass
-        if v < -128:
-            v = -128
-        elif v > 127:
-            v = 127
-        return v
-
-    def buffer(self):
-        return self._buffer
\ No newline at end of file
+class JoyStickInput_HORI_S(JoyStickInput):
+    _PROFILE = PROFILE
+    _TABLE = compile_profile(PROFILE)
@@ -1,2 +1,135 @@
+STICK_U8 = const(1)
+STICK_U12 = const(2)
+
+_KIND_BUTTON = const(0)
+_KIND_HAT = const(1)
+_KIND_HAT_CENTER = const(2)
+
+
+def compile_profile(profile: dict) -> dict:
+    # 把按键描述表编译为 按键名 -> (类型, 字节位置, 值) 的字典
+    table = dict()
+    buttons = profile.get("buttons")
+    for token in buttons:
+        table[token] = (_KIND_BUTTON, buttons[token][0], buttons[token][1])
+    hat = profile.get("hat")
+    if hat != None:
+        table["CENTER"] = (_KIND_HAT_CENTER, hat[0], hat[1])
+        for token in hat[2]:
+            table[token] = (_KIND_HAT, hat[0], hat[2][token])
+    return table
+
+
+def _coordinate_str_convert_int(str):
+    v = 0
+    try:
+        v = int(float(str))
+    except:
+        pass
+    if v < -128:
+        v = -128
+    elif v > 127:
+        v = 127
+    return v
+
+
+def _set_stick_u8(buffer, index, x, y):
+    if buffer[index] == 128 and buffer[index + 1] == 128:
+        buffer[index] = x + 128
+        buffer[index + 1] = y + 128
+
+
+def _set_stick_u12(buffer, index, x, y):
+    x = (x + 128) * 16
+    y = (y * (-1) + 128) * 16
+    if x > 0xfff:
+        x = 0xfff
+    if y > 0xfff:
+        y = 0xfff
+    buffer[index] = x & 0xff
+    buffer[index + 1] = ((x >> 8) & 0x0f) | ((y & 0x0f) << 4)
+    buffer[index + 2] = (y >> 4) & 0xff
+
+
 class JoyStickInput:
-    pass
\ No newline at end of file
+    _PROFILE = None
+    _TABLE = None
+
+    def __init__(self, input_line):
+        profile = self._PROFILE
+        table = self._TABLE
+        self._buffer = bytearray(profile["default"])
+        buffer = self._buffer
+        splits = input_line.upper().split("|", -1)
+        for s in splits:
+            s = s.strip()
+            entry = table.get(s)
+            if entry != None:
+                kind = entry[0]
+                if kind == _KIND_BUTTON:
+                    buffer[entry[1]] |= entry[2]
+                elif kind == _KIND_HAT_CENTER:
+                    buffer[entry[1]] = entry[2]
+                elif buffer[entry[1]] != profile["hat"][1]:
+                    # 同时设置多个十字键方向时回到中心
+                    buffer[entry[1]] = profile["hat"][1]
+                else:
+                    buffer[entry[1]] = entry[2]
+                continue
+            stick = s.split("@", -1)
+            if len(stick) != 2:
+                continue
+            d = profile["sticks"].get(stick[0])
+            if d == None:
+                continue
+            x = 0
+            y = 0
+            coordinate = stick[1].split(",", -1)
+            if len(coordinate) == 2:
+                x = _coordinate_str_convert_int(coordinate[0])
+                y = _coordinate_str_convert_int(coordinate[1])
+            if d[0] == STICK_U8:
+                _set_stick_u8(buffer, d[1], x, y)
+            elif d[0] == STICK_U12:
+                _set_stick_u12(buffer, d[1], x, y)
+
+    def buffer(self):
+        return self._buffer
+
+
+class LineCache(object):
+    def __init__(self, encoder, capacity: int = 32):
+        self._encoder = encoder
+        self._capacity = capacity
+        self._entries = dict()
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, action_line: str):
+        self._tick += 1
+        entry = self._entries.get(action_line)
+        if entry != None:
+            entry[1] = self._tick
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        if len(self._entries) >= self._capacity:
+            self._evict()
+        value = self._encoder(action_line)
+        self._entries[action_line] = [value, self._tick]
+        return value
+
+    def _evict(self):
+        oldest = None
+        oldest_tick = self._tick
+        for key in self._entries:
+            tick = self._entries[key][1]
+            if tick <= oldest_tick:
+                oldest = key
+                oldest_tick = tick
+        if oldest != None:
+            self._entries.pop(oldest)
+
+    def info(self) -> dict:
+        return dict({"size": len(self._entries), "capacity": self._capacity, "hits": self.hits, "misses": self.misses})
\ No newline at end of file
@@ -18,3 +18,9 @@ class JoyStick:
 
     async def do_action(self,action_line: str = ""):
         pass
+
+    def stats(self) -> dict:
+        return dict()
+
+    def reset_stats(self):
+        pass
@@ -1,16 +1,26 @@
 from hid.joystick.input.pro_controller import JoyStickInput_PRO_CONTROLLER
+from hid.joystick.input.joystick_input import LineCache
 from hid.joystick.joystick import JoyStick
+from hid.joystick.timing import Timing, parse_chain
 import hid.device
 import time
 import asyncio
+import gc
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+import customize.config as config
 _Min_Key_Send_Span_ns = 3 * 1000000
-_Key_Send_Loop_Span_ms = 1
+_Report_Interval_ms = 8
 _Send_Bytes_Length = 63
-_Space_Buffer = bytearray(_Send_Bytes_Length)
+_Report_Cache_Size = 32
+_Chain_Cache_Size = 64
+_Report_IDs = (0x21, 0x30, 0x81)
 
 mac_addr = b'\x00\x00\x5e\x00\x53\x5e'
 serial_number = b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x01'
 
+def _encode_report(action_line: str):
+    return bytes(JoyStickInput_PRO_CONTROLLER(action_line).buffer())
+
 class JoyStick_PRO_CONTROLLER(JoyStick):
     def __new__(cls, *args, **kwargs):
         if not hasattr(cls, '_instance'):
@@ -22,26 +32,55 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
     def __init__(self):
         if JoyStick_PRO_CONTROLLER._first:
             JoyStick_PRO_CONTROLLER._first = False
-            self._start_ns = time.monotonic_ns()
-            self._action_lock = asyncio.Lock()
-            self._action_line = ""
-            self._last_key_press_ns = 0
+            self._timing = Timing(_Min_Key_Send_Span_ns)
+            self._report_cache = LineCache(_encode_report, _Report_Cache_Size)
+            self._chain_cache = LineCache(self._parse_chain, _Chain_Cache_Size)
+            self._report = self._report_cache.get("")
+            # 每个报告ID一块固定的发送缓冲区，记录已写入长度以便只清零用过的部分
+            self._report_buffers = dict()
+            self._report_views = dict()
+            self._report_used = dict()
+            for report_id in _Report_IDs:
+                buf = bytearray(_Send_Bytes_Length)
+                self._report_buffers[report_id] = buf
+                self._report_views[report_id] = memoryview(buf)
+                self._report_used[report_id] = 0
+            self._gc_pauses = 0
+            self._alloc_bytes = 0
+            self._send_event = asyncio.Event()
+            self._last_send_ms = 0
+            self._report_interval_ms = _Report_Interval_ms
+            try:
+                interval = int(config.Config().get("report_interval_ms", "joystick"))
+                if interval > 0:
+                    self._report_interval_ms = interval
+            except:
+                pass
             device = hid.device.get_device(hid.device.Device_Switch_Pro)
             self._joystick_device = device.find_device()
 
     def _get_counter(self):
-        return int((time.monotonic_ns() - self._start_ns) * 360 / 1000000000 ) & 0xff
-    
+        # 计数器每秒增加360，64000ms正好是256的整数倍，先取模避免产生大整数
+        return ((ticks_ms() % 64000) * 9 // 25) & 0xff
+
     async def _send_loop(self):
         while True:
-            await asyncio.sleep_ms(_Key_Send_Loop_Span_ms)
+            await self._send_event.wait()
+            self._send_event.clear()
             if not self._connected:
                 continue
-            action_line = ""
-            async with self._action_lock:
-                action_line = self._action_line
-            input = JoyStickInput_PRO_CONTROLLER(action_line)
-            self._send_counter_data(input.buffer(),0x30)
+            self._send_counter_data(self._report,0x30)
+            self._last_send_ms = ticks_ms()
+
+    async def _keep_alive_loop(self):
+        # 输入没有变化时按固定间隔补发0x30报告，输入变化由send_realtime_action立即唤醒发送
+        while True:
+            wait = ticks_diff(ticks_add(self._last_send_ms, self._report_interval_ms), ticks_ms())
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
+                continue
+            self._send_event.set()
+            await asyncio.sleep_ms(self._report_interval_ms)
 
     async def _recv_0x80(self):
         while True:
@@ -54,16 +93,19 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
             if buffer:
                 cmd = buffer[0]
                 if cmd == 0x01:
-                    b = bytearray([cmd])
-                    b.extend(bytearray(b'\x00\x03'))
-                    b.extend(bytearray(mac_addr))
-                    self._send_data(b,0x81)
+                    view = self._report_views[0x81]
+                    view[0] = cmd
+                    view[1] = 0x00
+                    view[2] = 0x03
+                    view[3:9] = mac_addr
+                    self._send_report(0x81, 9)
                 elif cmd == 0x02 or cmd == 0x03:
-                    b = bytearray([cmd])
-                    self._send_data(b,0x81)
+                    self._report_views[0x81][0] = cmd
+                    self._send_report(0x81, 1)
                 elif cmd == 0x04:
                     print("连接手柄")
                     self._connected = True
+                    self._send_event.set()
                 elif cmd == 0x05:
                     print("断开手柄")
                     self._connected = False
@@ -82,7 +124,7 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
             if buffer:
                 subcmd = buffer[9]
                 if subcmd == 0x01: # Bluetooth manual pairing
-                    await self._uart_response(0x81, subcmd, [0x03])
+                    await self._uart_response(0x81, subcmd, b'\x03')
                 # REQUEST_DEVICE_INFO 0x02
                 elif subcmd == 0x02: # Request device info
                     # 0-1 Firmware version (Eg: 3.139)
@@ -91,10 +133,7 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
                     # 4-9 Controller Bluetooth MAC address
                     # 10 Unknown, always 01 (maybe?)
                     # 11 If 01, colors in SPI used for Controller color
-                    b = bytearray(b'\x04\x21\x03\x02')
-                    b.extend(bytearray(mac_addr))
-                    b.extend(bytearray(b'\x01\x01'))
-                    await self._uart_response(0x82, subcmd, b)
+                    await self._uart_response(0x82, subcmd, b'\x04\x21\x03\x02' + mac_addr + b'\x01\x01')
                 # SET_MODE 0x03
                 # SET_SHIPMENT 0x08
                 # SET_PLAYER 0x30
@@ -102,16 +141,16 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
                 # ENABLE_VIBRATION 0x48
                 # 0x38 ?
                 elif subcmd == 0x03 or subcmd == 0x33 or subcmd == 0x08 or subcmd == 0x30 or subcmd == 0x38 or subcmd == 0x40 or subcmd == 0x41 or subcmd == 0x48:
-                    await self._uart_response(0x80, subcmd, [])
+                    await self._uart_response(0x80, subcmd, b'')
                 # TRIGGER_BUTTONS 0x04
                 elif subcmd == 0x04: # Trigger buttons elapsed time
-                    await self._uart_response(0x83, subcmd, [])
+                    await self._uart_response(0x83, subcmd, b'')
                 # SET_NFC_IR_CONFIG 0x21
                 elif subcmd == 0x21: # Set NFC/IR MCU configuration
                     await self._uart_response(0xa0, subcmd, bytearray(b'\x01\x00\xff\x00\x08\x00\x1B\x01'))
                 # SET_NFC_IR_STATE 0x22
                 elif subcmd == 0x22:
-                    await self._uart_response(0x80, subcmd, [])
+                    await self._uart_response(0x80, subcmd, b'')
                 # SPI_READ 0x10
                 elif subcmd == 0x10:
                     if buffer[10:12] == b'\x00\x60': # Serial number
@@ -158,49 +197,79 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
                 pass
             await asyncio.sleep_ms(5)
 
-    async def _uart_response(self, code, subcmd, data):
-        action_line = ""
-        async with self._action_lock:
-            action_line = self._action_line
-        input = JoyStickInput_PRO_CONTROLLER(action_line)
-        buf = bytearray(input.buffer())
-        buf.extend(bytearray([code, subcmd]))
-        buf.extend(bytearray(data))
-        self._send_counter_data(buf,0x21)
+    async def _uart_response(self, code, subcmd, data, addr=None):
+        report = self._report
+        view = self._report_views[0x21]
+        offset = 1 + len(report)
+        view[1:offset] = report
+        view[offset] = code
+        view[offset + 1] = subcmd
+        offset += 2
+        if addr != None:
+            view[offset:offset + 2] = addr
+            view[offset + 2] = 0x00
+            view[offset + 3] = 0x00
+            view[offset + 4] = len(data)
+            offset += 5
+        end = offset + len(data)
+        if end > _Send_Bytes_Length:
+            end = _Send_Bytes_Length
+        if end - offset == len(data):
+            view[offset:end] = data
+        else:
+            # 超出缓冲区的部分丢弃，逐字节复制避免切片产生新对象
+            for i in range(end - offset):
+                view[offset + i] = data[i]
+        view[0] = self._get_counter()
+        self._send_report(0x21, end)
 
     async def _spi_response(self, addr, data):
-        buf = bytearray(addr)
-        buf.extend(bytearray([0x00, 0x00]))
-        buf.append(len(data))
-        buf.extend(bytearray(data))
-        await self._uart_response(0x90, 0x10, buf)
+        await self._uart_response(0x90, 0x10, data, addr)
     
     def _recv_data(self,report_id):
         buffer = self._joystick_device.get_last_received_report(report_id)
         return buffer
 
-    def _send_data(self,data:bytearray,report_id):
-        buffer = bytearray()
-        if data and len(data) >= _Send_Bytes_Length:
-            buffer.extend(data[:_Send_Bytes_Length])
-        else:
-            buffer.extend(data)
-            buffer.extend(_Space_Buffer[len(data):])
+    def _send_report(self,report_id,length):
+        # 上次写入比本次长的部分清零，未写过的字节一直保持为0
+        buffer = self._report_buffers[report_id]
+        for i in range(length, self._report_used[report_id]):
+            buffer[i] = 0
+        self._report_used[report_id] = length
+        # 只统计发送过程本身：可用内存增加说明发送期间触发了GC，减少的部分为发送路径上的分配
+        free = gc.mem_free()
         self._joystick_device.send_report(buffer,report_id)
-
-    def _send_counter_data(self,data:bytearray,report_id):
-        buffer = bytearray([self._get_counter()])
-        if data and len(data) + 1 >= _Send_Bytes_Length:
-            buffer.extend(data[:_Send_Bytes_Length - 1])
+        after = gc.mem_free()
+        if after > free:
+            self._gc_pauses += 1
         else:
-            buffer.extend(data)
-            buffer.extend(_Space_Buffer[len(buffer):])
-        self._joystick_device.send_report(buffer,report_id)
+            self._alloc_bytes += free - after
+
+    def _send_counter_data(self,data:bytes,report_id):
+        length = len(data) + 1
+        if length > _Send_Bytes_Length:
+            length = _Send_Bytes_Length
+        view = self._report_views[report_id]
+        view[0] = self._get_counter()
+        view[1:length] = data
+        self._send_report(report_id, length)
+
+    def stats(self) -> dict:
+        return dict({
+            "report_cache": self._report_cache.info(),
+            "chain_cache": self._chain_cache.info(),
+            "timing": self._timing.info(),
+            "gc_pauses": self._gc_pauses,
+            "alloc_bytes": self._alloc_bytes,
+        })
+
+    def reset_stats(self):
+        self._timing.reset()
 
     async def start(self):
-        self._start_ns = time.monotonic_ns()
         self._connected = False
         asyncio.create_task(self._send_loop())
+        asyncio.create_task(self._keep_alive_loop())
         asyncio.create_task(self._recv_0x80())
         asyncio.create_task(self._recv_0x01())
 
@@ -210,65 +279,21 @@ class JoyStick_PRO_CONTROLLER(JoyStick):
     def stop_realtime(self):
         pass
 
-    async def send_realtime_action(self,action_line):
-        async with self._action_lock:
-            if self._action_line != action_line:
-                self._action_line = action_line
-        self._last_key_press_ns = time.monotonic_ns()
+    def _set_report(self,report:bytes):
+        if self._report != report:
+            self._report = report
+            self._send_event.set()
 
-    async def _send(self,  input_line: str = "",earliest_send_key_monotonic_ns=0):
-        earliest = self._last_key_press_ns + _Min_Key_Send_Span_ns
-        if earliest < earliest_send_key_monotonic_ns:
-            earliest = earliest_send_key_monotonic_ns
-        loop = 0
-        while True:
-            loop += 1
-            now = time.monotonic_ns()
-            if now >= earliest:
-                break
-            elif now < earliest - _Min_Key_Send_Span_ns:
-                ms = int((earliest - now  - _Min_Key_Send_Span_ns)/1000000)
-                await asyncio.sleep_ms(ms)
-            else:
-                time.sleep(0.0001)
-        t1 = time.monotonic_ns()
-        await self.send_realtime_action(input_line)
-        t2 = time.monotonic_ns()
+    def _parse_chain(self, action_line: str):
+        return parse_chain(action_line, self._report_cache.get)
 
-    async def _key_press(self,  inputs = []):
-        release_monotonic_ns = 0
-        last_action = ""
-        for input_line in inputs:
-            last_action = input_line[0]
-            if input_line[0] == "~":
-                continue
-            await self._send(input_line[0],release_monotonic_ns)
-            release_monotonic_ns = self._last_key_press_ns + input_line[1]*1000000000
-        if last_action != "~":
-            await self.release(release_monotonic_ns)
+    async def send_realtime_action(self,action_line):
+        self._set_report(self._report_cache.get(action_line))
+        self._timing.last_send_ns = time.monotonic_ns()
 
     async def release(self,release_monotonic_ns:float = 0):
-        await self._send("",release_monotonic_ns)
+        await self._timing.wait_until(release_monotonic_ns)
+        await self._timing.play(self._set_report, ((self._report_cache.get(""), 0),))
 
     async def do_action(self,  action_line: str = ""):
-        inputs = []
-        actions = action_line.split("->")
-        for action in actions:
-            splits = action.split(":")
-            if len(splits) > 2:
-                continue
-            p1 = splits[0]
-            p2 = 0.1
-            if len(splits) == 1:
-                try:
-                    p2 = float(splits[0])
-                    p1 = ""
-                except:
-                    pass
-            else:
-                try:
-                    p2 = float(splits[1])
-                except:
-                    pass
-            inputs.append((p1,p2))
-        await self._key_press(inputs)
\ No newline at end of file
+        await self._timing.play(self._set_report, self._chain_cache.get(action_line))
\ No newline at end of file
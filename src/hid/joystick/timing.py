@@ -0,0 +1,103 @@
+import time
+import asyncio
+
+# 距离截止时间小于该值时不再让出事件循环，改为忙等
+_Spin_Window_ns = 300000
+# 延迟直方图分桶上界（微秒），最后一个桶统计超出全部上界的情况
+_Lateness_Buckets_us = (100, 250, 500, 1000, 2000, 5000, 10000)
+
+
+def parse_chain(action_line: str, encode) -> tuple:
+    # 把"A:0.05->B:0.03"解析为(报告, 持续时间ns)序列，最后一项不是~时追加释放按键
+    steps = []
+    last_action = ""
+    for action in action_line.split("->"):
+        splits = action.split(":")
+        if len(splits) > 2:
+            continue
+        p1 = splits[0]
+        p2 = 0.1
+        if len(splits) == 1:
+            try:
+                p2 = float(splits[0])
+                p1 = ""
+            except:
+                pass
+        else:
+            try:
+                p2 = float(splits[1])
+            except:
+                pass
+        last_action = p1
+        if p1 == "~":
+            continue
+        steps.append((encode(p1), int(p2 * 1000000000)))
+    if last_action != "~":
+        steps.append((encode(""), 0))
+    return tuple(steps)
+
+
+class Timing:
+    def __init__(self, min_span_ns: int):
+        self._min_span_ns = min_span_ns
+        self.last_send_ns = 0
+        self.reset()
+
+    def reset(self):
+        self._histogram = [0] * (len(_Lateness_Buckets_us) + 1)
+        self._count = 0
+        self._total_ns = 0
+        self._max_ns = 0
+
+    async def wait_until(self, deadline_ns: int):
+        while True:
+            remain = deadline_ns - time.monotonic_ns()
+            if remain <= 0:
+                return
+            if remain <= _Spin_Window_ns:
+                while time.monotonic_ns() < deadline_ns:
+                    pass
+                return
+            await asyncio.sleep_ms((remain - _Spin_Window_ns) // 1000000)
+
+    def record(self, lateness_ns: int):
+        if lateness_ns < 0:
+            lateness_ns = 0
+        us = lateness_ns // 1000
+        i = 0
+        while i < len(_Lateness_Buckets_us) and us >= _Lateness_Buckets_us[i]:
+            i += 1
+        self._histogram[i] += 1
+        self._count += 1
+        self._total_ns += lateness_ns
+        if lateness_ns > self._max_ns:
+            self._max_ns = lateness_ns
+
+    async def play(self, send, steps):
+        # steps为(报告, 持续时间ns)序列，整条链的截止时间都以第一次发送时刻为基准推算，避免误差累积
+        deadline = self.last_send_ns + self._min_span_ns
+        now = time.monotonic_ns()
+        if deadline < now:
+            deadline = now
+        for step in steps:
+            await self.wait_until(deadline)
+            send(step[0])
+            self.last_send_ns = time.monotonic_ns()
+            self.record(self.last_send_ns - deadline)
+            span = step[1]
+            if span < self._min_span_ns:
+                span = self._min_span_ns
+            # 发送过晚时仍保证本次报告至少保持最小间隔
+            deadline = max(deadline + span, self.last_send_ns + self._min_span_ns)
+
+    def info(self) -> dict:
+        avg = 0
+        if self._count > 0:
+            avg = self._total_ns // self._count // 1000
+        return dict({
+            "count": self._count,
+            "avg_us": avg,
+            "max_us": self._max_ns // 1000,
+            "buckets_us": list(_Lateness_Buckets_us),
+            "histogram": list(self._histogram),
+        })
@@ -4,10 +4,15 @@ import customize.wifi_connect as wifi_connect
 import customize.device_info as device_info
 import macros
 import asyncio
-from adafruit_httpserver.response import Response,FileResponse
+import json
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+from adafruit_httpserver.response import Response, JSONResponse
+from adafruit_httpserver.status import Status, ACCEPTED_202, BAD_REQUEST_400, NOT_FOUND_404, TOO_MANY_REQUESTS_429, SERVICE_UNAVAILABLE_503
 from adafruit_httpserver.server import Server
 from adafruit_httpserver.mime_types import MIMETypes
 from adafruit_httpserver.request import Request
+import async_http
+from async_http import AsyncHttpServer, EventStream, static_file, NOT_MODIFIED_304
 
 MIMETypes.configure(
     default_to="text/plain",
@@ -16,20 +21,31 @@ MIMETypes.configure(
 
 _pool = socketpool.SocketPool(wifi.radio)
 _server = Server(_pool,"/")
+_async_server = AsyncHttpServer(_server)
+
+# /events推送间隔：脚本状态变化后至少间隔200ms推送一次，设备信息10秒一次，存储空间60秒一次
+_EVENT_MIN_INTERVAL_MS = 200
+_DEVICE_INTERVAL_MS = 10000
+_ROM_INTERVAL_MS = 60000
+_HEARTBEAT_MS = 15000
+
+CONFLICT_409 = Status(409, "Conflict")
 
 
 async def serve():
-    global _server
     HOST = str(wifi_connect.ip_address())
     print(HOST)
-    _server.start(HOST)
-
-    while True:
-        try:
-            _server.poll()
+    if not async_http.supported():
+        print("adafruit_httpserver版本与{}不一致，使用轮询方式处理HTTP请求".format(async_http.HTTPSERVER_VERSION))
+        _server.start(HOST)
+        while True:
+            try:
+                _server.poll()
+            except OSError:
+                pass
             await asyncio.sleep_ms(50)
-        except OSError:
-            continue
+    _async_server.start(HOST)
+    await _async_server.serve()
 
 
 @_server.route("/cpu", "GET")
@@ -50,6 +66,16 @@ def rom(request: Request):
 def status(request: Request):
     txt = ""
     txt += "{}\n\n".format(macros.status_info())
+    queue = macros.queue_info()
+    txt += "任务队列：{}/{}，丢弃{}次，拒绝{}次\n".format(queue["depth"], queue["capacity"], queue["dropped"], queue["rejected"])
+    realtime = macros.realtime_info()
+    txt += "实时控制：合并{}次\n".format(realtime["coalesced"])
+    stats = macros.joystick.stats()
+    cache = stats.get("report_cache")
+    if cache != None:
+        txt += "HID报告缓存：命中{}次，未命中{}次\n".format(cache["hits"], cache["misses"])
+    if stats.get("gc_pauses") != None:
+        txt += "HID报告发送：发送期间GC{}次，分配内存{}字节\n".format(stats["gc_pauses"], stats["alloc_bytes"])
     txt += "CPU温度: {: .2f}\n".format(device_info.cpu_temperature())
     txt += "剩余内存: {: .2f}KB\n".format(device_info.mem_free())
     rom = device_info.get_rom_info()
@@ -57,6 +83,74 @@ def status(request: Request):
     return Response(request, content_type="text/plain;charset=utf-8",body=txt)
 
 
+def _delta(last: dict, current: dict) -> dict:
+    ret = dict()
+    for k in current:
+        if last.get(k) != current[k]:
+            ret[k] = current[k]
+            last[k] = current[k]
+    return ret
+
+
+def _device_snapshot(rom):
+    queue = macros.queue_info()
+    return dict({
+        "cpu": round(device_info.cpu_temperature(), 1),
+        "ram": round(device_info.mem_free(), 1),
+        "rom_free": round(rom[0], 2),
+        "rom_total": round(rom[1], 2),
+        "queue": queue["depth"],
+        "dropped": queue["dropped"],
+        "rejected": queue["rejected"],
+        "coalesced": macros.realtime_info()["coalesced"],
+    })
+
+
+async def _push_events(stream: EventStream):
+    version = -1
+    macro_last = dict()
+    device_last = dict()
+    rom = None
+    now = ticks_ms()
+    device_deadline = now
+    rom_deadline = now
+    sent_ticks = now
+    while True:
+        version = await macros.wait_status(version, ticks_diff(device_deadline, ticks_ms()))
+        now = ticks_ms()
+        delta = _delta(macro_last, macros.status_snapshot())
+        if len(delta) > 0:
+            await stream.send(json.dumps(delta), "macro")
+            sent_ticks = ticks_ms()
+            await asyncio.sleep_ms(_EVENT_MIN_INTERVAL_MS)
+        if ticks_diff(now, device_deadline) >= 0:
+            device_deadline = ticks_add(now, _DEVICE_INTERVAL_MS)
+            if rom == None or ticks_diff(now, rom_deadline) >= 0:
+                rom_deadline = ticks_add(now, _ROM_INTERVAL_MS)
+                rom = device_info.get_rom_info()
+            delta = _delta(device_last, _device_snapshot(rom))
+            if len(delta) > 0:
+                await stream.send(json.dumps(delta), "device")
+                sent_ticks = ticks_ms()
+        if ticks_diff(ticks_ms(), sent_ticks) >= _HEARTBEAT_MS:
+            await stream.heartbeat()
+            sent_ticks = ticks_ms()
+
+
+@_server.route("/events", "GET")
+def events(request: Request):
+    # 轮询方式无法保持长连接，返回503，页面改为定时查询状态
+    if not async_http.supported():
+        return Response(request, "", status=SERVICE_UNAVAILABLE_503)
+    return EventStream(request, _push_events)
+
+
+@_server.route("/timing", "GET")
+def timing(request: Request):
+    body = macros.timing_stats(request.query_params.get("reset") == "1")
+    return Response(request, content_type="application/json",body=body)
+
+
 @_server.route("/macro/current", "GET")
 def macro_current(request: Request):
     return Response(request, content_type="text/plain;charset=utf-8",body=macros.current_info())
@@ -79,20 +173,71 @@ def marcos(request: Request):
 
 @_server.route("/macro/start", "POST")
 def macro_start(request: Request):
-    raw_text = request.raw_request.decode("utf8")
-    splits = raw_text.split("\n")
-    cmd = splits[len(splits) - 1]
-    ret = macros.add_joystick_task(cmd)
+    cmd = request.body.decode("utf8")
+    ret = macros.add_joystick_task(cmd, "http")
     return Response(request, content_type="text/plain;charset=utf-8",body=ret)
 
+
+def _api_error(request: Request, status: Status, msg: str):
+    return JSONResponse(request, dict({"error": msg}), status=status)
+
+
+@_server.route("/api/v1/macros", "GET")
+def api_macros(request: Request):
+    body, tag = macros.catalog()
+    headers = dict({"ETag": tag, "Cache-Control": "no-cache"})
+    if tag in request.headers.get("If-None-Match", ""):
+        return Response(request, status=NOT_MODIFIED_304, headers=headers)
+    return Response(request, body, content_type="application/json", headers=headers)
+
+
+@_server.route("/api/v1/macros/<name>/start", "POST")
+def api_macro_start(request: Request, name: str):
+    try:
+        cmd = request.json()
+    except:
+        return _api_error(request, BAD_REQUEST_400, "请求内容不是有效的JSON")
+    if cmd == None:
+        cmd = dict()
+    if type(cmd) is not dict:
+        return _api_error(request, BAD_REQUEST_400, "请求内容必须是JSON对象")
+    loop = cmd.get("loop", -1)
+    paras = cmd.get("paras")
+    if type(loop) is not int or (paras != None and type(paras) is not dict):
+        return _api_error(request, BAD_REQUEST_400, "loop必须是整数，paras必须是对象")
+    if not macros.has_macro(name):
+        return _api_error(request, NOT_FOUND_404, "不存在名称为{}的脚本".format(name))
+    if macros.realtime_running():
+        return _api_error(request, CONFLICT_409, "实时控制模式下不能启动脚本")
+    if cmd.get("stop") == True:
+        macros.macro_stop()
+    if not macros.enqueue_macro(name, loop, paras):
+        return _api_error(request, TOO_MANY_REQUESTS_429, "任务队列已满")
+    return JSONResponse(request, dict({"name": name, "loop": loop, "queued": True}), status=ACCEPTED_202)
+
+
+@_server.route("/api/v1/queue", "GET")
+def api_queue(request: Request):
+    return JSONResponse(request, dict({"queue": macros.queue_info(), "realtime": macros.realtime_info()}))
+
+
+@_server.route("/api/v1/status", "GET")
+def api_status(request: Request):
+    return JSONResponse(request, dict({
+        "macro": macros.status_snapshot(),
+        "device": _device_snapshot(device_info.get_rom_info()),
+        "http": _async_server.info(),
+    }))
+
 @_server.route("/")
 def index_root(request: Request):
-    return FileResponse(request, filename='index.html', root_path='/web')
+    return static_file(request, 'index.html', '/web')
 
 @_server.route("/index.html")
 def index(request: Request):
-    return FileResponse(request, filename='index.html', root_path='/web')
+    return static_file(request, 'index.html', '/web')
 
+# 文件名带版本号，内容不会变化，浏览器缓存一年
 @_server.route("/jquery-3.6.1.min.js")
 def js1(request: Request):
-    return FileResponse(request, filename='jquery-3.6.1.min.js', root_path='/web')
+    return static_file(request, 'jquery-3.6.1.min.js', '/web', 31536000)
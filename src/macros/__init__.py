@@ -1,4 +1,4 @@
-from macros import macro,action
+from macros import macro,action,action_queue
 import hid.joystick
 import time
 import asyncio
@@ -14,7 +14,27 @@ _realtime_running: bool = False
 _current_info = ""
 _result_info = ""
 _start_time = None
-_action_queue = []
+_run_name = ""
+_run_times = 0
+_run_loop = 0
+# 状态版本号，脚本状态或运行次数变化时递增，供/events推送增量
+_status_version = 0
+_status_event = asyncio.Event()
+
+def _create_queue():
+    c = config.Config()
+    capacity = 32
+    try:
+        capacity = int(c.get("macros.queue.capacity"))
+    except:
+        pass
+    policy = c.get("macros.queue.overflow")
+    if type(policy) is not str:
+        policy = action_queue.DROP_OLDEST
+    return action_queue.ActionQueue(capacity, policy)
+
+_action_queue = _create_queue()
+_realtime_channel = action_queue.RealtimeChannel()
 
 def status_info():
     global _start_time
@@ -43,24 +63,56 @@ def result_info():
     global _result_info
     return _result_info
 
-def add_joystick_task(cmd: str):
+def _status_changed():
+    global _status_version
+    _status_version += 1
+    _status_event.set()
+
+async def wait_status(version: int, timeout_ms: int) -> int:
+    if version == _status_version and timeout_ms > 0:
+        _status_event.clear()
+        try:
+            await asyncio.wait_for_ms(_status_event.wait(), timeout_ms)
+        except asyncio.TimeoutError:
+            pass
+    return _status_version
+
+def status_snapshot():
+    running = _start_time != None and _start_time != 0
+    elapsed = 0
+    if running:
+        elapsed = int(time.time() - _start_time)
+    return dict({
+        "running": running,
+        "stopping": running and not _macro_running,
+        "realtime": _realtime_running,
+        "name": _run_name,
+        "times": _run_times,
+        "loop": _run_loop,
+        "elapsed": elapsed,
+        "result": _result_info,
+    })
+
+def add_joystick_task(cmd: str, source = ""):
     try:
-        return _create_task_json(json.loads(cmd))
+        return _create_task_json(json.loads(cmd), source)
     except:
         global _result_info
         _result_info = "启动命令{}有错误，请检查。".format(cmd)
+        _status_changed()
         return _result_info
 
 def macro_stop():
     global _macro_running
     _macro_running = False
-    global _action_queue
-    _action_queue = []
+    _action_queue.clear()
+    _status_changed()
 
 
 def action_queue_task_start():
     tm = task_manager.TaskManager()
     tm.create_task(_run_queue(), TASK_TAG)
+    tm.create_task(_run_realtime(), TASK_TAG)
     add_joystick_task('{"name":"common.wakeup_joystick","loop":1}')
     
 
@@ -71,26 +123,30 @@ def auto_run():
     except:
         global _result_info
         _result_info = "Config文件macro.autorun节点存在错误，无法启动脚本"
+        _status_changed()
 
 
-def _create_task_json(cmd: dict):
-    global _action_queue
+def _create_task_json(cmd: dict, source = ""):
     realtime_action = cmd.get("realtime")
     if type(realtime_action) is str:
         global _realtime_running
         if realtime_action == "action_start":
             macro_stop()
             _realtime_running = True
+            _realtime_channel.clear()
             joystick.start_realtime()
+            _status_changed()
             return "开始实时控制模式"
         elif realtime_action == "action_stop":
             _realtime_running = False
             joystick.stop_realtime()
+            _status_changed()
             return "结束实时控制模式"
         else:
-            if _realtime_running:
-                _action_queue.append((realtime_action,))
-                return
+            add_realtime_action(realtime_action, source)
+            return
+    if cmd.get("stats") == "timing":
+        return timing_stats(cmd.get("reset") == True)
     if _realtime_running:
         return
     s = cmd.get("stop")
@@ -110,38 +166,58 @@ def _create_task_json(cmd: dict):
         loop = c2
     else:
         loop = -1
-    try:
-        _action_queue.append((name, loop, paras))
+    if enqueue_macro(name, loop, paras):
         return "{}：已添加任务。".format((name, loop, paras))
-    except:
-         return "任务队列已满。".format((name, loop, paras))
+    else:
+        return "任务队列已满。"
+
 
+def enqueue_macro(name: str, loop: int = -1, paras: dict = None) -> bool:
+    return _action_queue.put((name, loop, paras))
+
+def has_macro(name: str) -> bool:
+    return macro.Macro().has_macro(name)
+
+def realtime_running() -> bool:
+    return _realtime_running
+
+
+def timing_stats(reset: bool = False):
+    ret = json.dumps(joystick.stats().get("timing"), separators=(',', ':'))
+    if reset:
+        joystick.reset_stats()
+    return ret
 
 def published():
-    m= macro.Macro()
-    if m._publish!= None:
-        return json.dumps(m._publish, separators=(',', ':'))
-    else:
-        return ""
+    return macro.Macro().catalog()[0]
+
+def catalog():
+    return macro.Macro().catalog()
+
+def add_realtime_action(action_line: str, source = ""):
+    if _realtime_running:
+        _realtime_channel.put(source, action_line)
+
+def queue_info():
+    return _action_queue.info()
+
+def realtime_info():
+    return _realtime_channel.info()
 
 async def _run_queue():
-    global _realtime_running
     while True:
-        t = None
-        global _action_queue
-        if len(_action_queue) > 0:
-            t = _action_queue[0]
-            _action_queue.remove(t)
-        if _realtime_running:
-            if t == None or len(t)!=1:
-                await asyncio.sleep_ms(1)
-                continue
-            await joystick.send_realtime_action(t[0])
-        else:
-            if t == None or len(t)<3:
-                await asyncio.sleep_ms(10)
-                continue
-            await _run(t[0],t[1],t[2])
+        t = await _action_queue.get()
+        if _realtime_running or len(t)<3:
+            continue
+        await _run(t[0],t[1],t[2])
+
+async def _run_realtime():
+    while True:
+        pending = await _realtime_channel.take()
+        if not _realtime_running:
+            continue
+        for source in pending:
+            await joystick.send_realtime_action(pending[source])
             
 
 async def _run(name: str, loop: int = 1, paras: dict = dict()):
@@ -154,8 +230,14 @@ async def _run(name: str, loop: int = 1, paras: dict = dict()):
     global _current_info
     global _result_info
     global _start_time
+    global _run_name
+    global _run_times
+    global _run_loop
     start_ts = time.time()
     _start_time = start_ts
+    _run_name = name
+    _run_times = 0
+    _run_loop = loop
     try:
         act = _get_action(name,paras)
         if act == None:
@@ -165,6 +247,7 @@ async def _run(name: str, loop: int = 1, paras: dict = dict()):
         _result_info = ""
         _current_info = "正在运行[{}]脚本，已运行{}次，计划运行{}次\n".format(
             name, times, loop)
+        _status_changed()
         while True:
             while True:
                 if not _macro_running:
@@ -176,8 +259,10 @@ async def _run(name: str, loop: int = 1, paras: dict = dict()):
                 if ret[1]:
                     break
             times += 1
+            _run_times = times
             _current_info = "正在运行[{}]脚本，已运行{}次，计划运行{}次\n".format(
                 name, times, loop)
+            _status_changed()
             if loop > 0 and times >= loop:
                 break
             act.cycle_reset()
@@ -197,6 +282,8 @@ async def _run(name: str, loop: int = 1, paras: dict = dict()):
         _start_time = None
         _macro_running = False
         _current_info = ""
+        _run_name = ""
+        _status_changed()
 
 
 def _get_action(name: str,paras:dict=dict()) -> action.Action:
@@ -1,4 +1,4 @@
-from . import macro,paras
+from . import macro,paras,node
 
 
 class Action(object):
@@ -8,52 +8,55 @@ class Action(object):
         self._head = n[0]
         self._paras = paras.Paras(n[1],in_paras)
         self._current = self._head
+        self._pc = 0
         self._current_node_link_cycle_times = 1
         self._waiting_node = []
         self._body = self._head
+        self._body_pc = 0
         self._body_current_node_link_cycle_times = 1
         self._body_waiting_node = []
 
     def _jump_node(self):
-        action_line = self._current.action
-        if not action_line.startswith("["):
+        current = self._current
+        op = current.ops[self._pc]
+        if op != node.OP_JUMP and op != node.OP_COND and op != node.OP_REPEAT:
             return False
-        splits = action_line.split("]")
-        key = splits[0][1:]
-        times = 0
-        if splits[1].startswith("?"):
-            if self._paras.get_bool(splits[1][1:]):
-                times = 1
-        elif splits[1].startswith("*"):
-            times = self._paras.get_int(splits[1][1:])
-        else:
-            times = 1
-        n = self._macro.get_node(key)
-        node = n[0]
-        if node.action != macro._FINISHED_LINE and times >= 1:
+        index = self._pc * 2
+        times = 1
+        if op == node.OP_COND:
+            if not self._paras.get_bool(current.strings[current.args[index + 1]]):
+                times = 0
+        elif op == node.OP_REPEAT:
+            times = self._paras.get_int(current.strings[current.args[index + 1]])
+        target = None
+        if current.links != None:
+            target = current.links[self._pc]
+        if target == None:
+            target = self._macro.get_node(current.strings[current.args[index]])[0]
+        if target != None and target.ops[0] != node.OP_END and times >= 1:
             self._waiting_node.append(
-                [self._current.next, self._current_node_link_cycle_times])
-            self._current = node
+                (current, self._pc + 1, self._current_node_link_cycle_times))
+            self._current = target
+            self._pc = 0
             self._current_node_link_cycle_times = times
             return True
-        elif self._current != macro._FINISHED_LINE and times < 1:
-            self._current = self._current.next
-            return True
-        return False
+        self._pc += 1
+        return True
 
     def _return_jump(self):
-        if self._current.action != macro._FINISHED_LINE:
+        if self._current.ops[self._pc] != node.OP_END:
             return
         if self._current_node_link_cycle_times > 1:
-            self._current = self._current.head
+            self._pc = 0
             self._current_node_link_cycle_times -= 1
             return
         elif len(self._waiting_node) > 0:
             ret = self._waiting_node.pop()
             self._current = ret[0]
-            self._current_node_link_cycle_times = ret[1]
-            
-            if self._current.action == macro._FINISHED_LINE:
+            self._pc = ret[1]
+            self._current_node_link_cycle_times = ret[2]
+
+            if self._current.ops[self._pc] == node.OP_END:
                 self._return_jump()
 
     def pop(self):
@@ -64,54 +67,60 @@ class Action(object):
                 return None, True
             while self._jump_node():
                 pass
-            line = self._current.action
-            if line == "body:":
-                self._current = self._current.next
+            op = self._current.ops[self._pc]
+            if op == node.OP_BODY:
+                self._pc += 1
                 self._return_jump()
-                if self._current.action == macro._FINISHED_LINE:
+                if self._current.ops[self._pc] == node.OP_END:
                     return None, True
-                line = self._current.action
                 self._body = self._current
+                self._body_pc = self._pc
                 self._body_current_node_link_cycle_times = self._current_node_link_cycle_times
                 self._body_waiting_node = []
                 for row in self._waiting_node:
                     self._body_waiting_node.append(row)
                 continue
-            elif line.startswith("EXEC>"):
-                self._paras.exec_str(line[5:])
-                self._current = self._current.next
+            elif op == node.OP_EXEC:
+                self._paras.exec_str(self._current.strings[self._current.args[self._pc * 2]])
+                self._pc += 1
                 self._return_jump()
-                if self._current.action == macro._FINISHED_LINE:
+                if self._current.ops[self._pc] == node.OP_END:
                     return None, True
-                line = self._current.action
                 continue
-            elif self._current.action == macro._FINISHED_LINE:
+            elif op == node.OP_END:
                 self._return_jump()
-                if self._current.action == macro._FINISHED_LINE:
+                if self._current.ops[self._pc] == node.OP_END:
                     return None, True
             else:
                 break
-        self._current = self._current.next
+        current = self._current
+        template = None
+        if current.templates != None:
+            template = current.templates.get(self._pc)
+        if template == None:
+            line = current.strings[current.args[self._pc * 2]]
+        else:
+            line = self._render(template)
+        self._pc += 1
         self._return_jump()
-        if line:
-            var_strs = self.extract_action_variable_str(line)
-            for var_str in var_strs:
-                line = line.replace("-*" + var_str + "*-", str(self._paras.get_float(var_str)))
         return line, is_finish
 
-    def extract_action_variable_str(self, text):
-        parts = text.split('-*')
-        result = [part.split('*-')[0] for part in parts if '*-' in part]
-        return result
+    def _render(self, template: tuple) -> str:
+        segments = list(template)
+        for i in range(1, len(segments), 2):
+            segments[i] = str(self._paras.get_float(segments[i]))
+        return "".join(segments)
 
     def reset(self):
         self._current = self._head
+        self._pc = 0
         self._current_node_link_cycle_times = 1
         self._waiting_node = []
 
     def cycle_reset(self):
         self._current = self._body
+        self._pc = self._body_pc
         self._current_node_link_cycle_times = self._body_current_node_link_cycle_times
         self._waiting_node = []
         for row in self._body_waiting_node:
-            self._waiting_node.append(row)
+            self._waiting_node.append(row)
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+REJECT = "reject"
+
+
+class ActionQueue(object):
+    def __init__(self, capacity: int = 32, policy: str = DROP_OLDEST):
+        if capacity < 1:
+            capacity = 1
+        if policy != DROP_NEWEST and policy != REJECT:
+            policy = DROP_OLDEST
+        self._items = [None] * capacity
+        self._capacity = capacity
+        self._policy = policy
+        self._head = 0
+        self._size = 0
+        self._event = asyncio.Event()
+        self.dropped = 0
+        self.rejected = 0
+
+    def __len__(self):
+        return self._size
+
+    def put(self, item) -> bool:
+        # 返回False表示按reject策略拒绝，调用方需要告知发送方
+        if self._size >= self._capacity:
+            if self._policy == REJECT:
+                self.rejected += 1
+                return False
+            self.dropped += 1
+            if self._policy == DROP_NEWEST:
+                return True
+            self._items[self._head] = None
+            self._head = (self._head + 1) % self._capacity
+            self._size -= 1
+        self._items[(self._head + self._size) % self._capacity] = item
+        self._size += 1
+        self._event.set()
+        return True
+
+    async def get(self):
+        while self._size == 0:
+            self._event.clear()
+            await self._event.wait()
+        item = self._items[self._head]
+        self._items[self._head] = None
+        self._head = (self._head + 1) % self._capacity
+        self._size -= 1
+        return item
+
+    def clear(self):
+        for i in range(self._capacity):
+            self._items[i] = None
+        self._head = 0
+        self._size = 0
+
+    def info(self) -> dict:
+        return dict({
+            "depth": self._size,
+            "capacity": self._capacity,
+            "policy": self._policy,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        })
+
+
+class RealtimeChannel(object):
+    # 实时控制只保留每个来源的最新状态，未发送的旧状态直接被覆盖
+    def __init__(self):
+        self._pending = dict()
+        self._event = asyncio.Event()
+        self.coalesced = 0
+
+    def put(self, source, state):
+        if source in self._pending:
+            self.coalesced += 1
+        self._pending[source] = state
+        self._event.set()
+
+    async def take(self) -> dict:
+        while len(self._pending) == 0:
+            self._event.clear()
+            await self._event.wait()
+        pending = self._pending
+        self._pending = dict()
+        return pending
+
+    def clear(self):
+        self._pending = dict()
+
+    def info(self) -> dict:
+        return dict({"pending": len(self._pending), "coalesced": self.coalesced})
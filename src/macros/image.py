@@ -0,0 +1,130 @@
+import os
+import json
+import struct
+from macros import node
+
+IMAGE_EXT = ".mc"
+
+_MAGIC = b"MCI"
+_VERSION = const(1)
+# magic, version, source size, source mtime, strings, constants, macros
+_HEADER = "<3sBIIHHH"
+_INSTR = "<BHH"
+_INSTR_SIZE = const(5)
+
+
+def image_path(filename: str) -> str:
+    return filename[:len(filename) - 2] + IMAGE_EXT
+
+
+def source_stamp(filename: str):
+    st = os.stat(filename)
+    return st[6], st[8]
+
+
+def encode_row(row: str, strings: node.Pool, consts: node.Pool):
+    op, s1, s2 = node.parse_row(row)
+    a = 0
+    b = 0
+    if op == node.OP_WAIT:
+        # 等待时间以微秒整数保存，避免浮点精度误差
+        a = consts.intern(int(float(s1) * 1000000 + 0.5))
+    elif s1 != None:
+        a = strings.intern(s1)
+    if s2 != None:
+        b = strings.intern(s2)
+    return op, a, b
+
+
+def dump(filename: str, dic: dict, publish: list, paras: dict) -> bool:
+    strings = node.Pool()
+    consts = node.Pool()
+    macros = []
+    try:
+        for name in dic.keys():
+            code = []
+            for row in dic[name]:
+                code.append(encode_row(row, strings, consts))
+            macros.append((strings.intern(name), code))
+    except (ValueError, OverflowError):
+        return False
+    # 等待时间超出镜像能保存的范围（负数或超过4294秒）时不生成镜像，继续使用源文件
+    for c in consts.items:
+        if c < 0 or c > 0xFFFFFFFF:
+            return False
+    meta = json.dumps({"publish": publish, "paras": paras})
+    path = image_path(filename)
+    try:
+        size, mtime = source_stamp(filename)
+        f = open(path, "wb")
+    except OSError:
+        # 设备通过USB挂载时文件系统只读，无法生成镜像，下次启动继续解析源文件
+        return False
+    try:
+        f.write(struct.pack(_HEADER, _MAGIC, _VERSION, size, mtime,
+                            len(strings.items), len(consts.items), len(macros)))
+        for s in strings.items:
+            b = s.encode("utf-8")
+            f.write(struct.pack("<H", len(b)))
+            f.write(b)
+        for c in consts.items:
+            f.write(struct.pack("<I", c))
+        for m in macros:
+            f.write(struct.pack("<HH", m[0], len(m[1])))
+            for instr in m[1]:
+                f.write(struct.pack(_INSTR, instr[0], instr[1], instr[2]))
+        b = meta.encode("utf-8")
+        f.write(struct.pack("<I", len(b)))
+        f.write(b)
+        f.close()
+        return True
+    except Exception:
+        f.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return False
+
+
+def load(filename: str):
+    path = image_path(filename)
+    try:
+        size, mtime = source_stamp(filename)
+        f = open(path, "rb")
+    except OSError:
+        return None
+    try:
+        header = struct.unpack(_HEADER, f.read(struct.calcsize(_HEADER)))
+        if header[0] != _MAGIC or header[1] != _VERSION or header[2] != size or header[3] != mtime:
+            return None
+        strings = node.Pool()
+        for i in range(header[4]):
+            n = struct.unpack("<H", f.read(2))[0]
+            strings.intern(str(f.read(n), "utf-8"))
+        waits = []
+        for i in range(header[5]):
+            us = struct.unpack("<I", f.read(4))[0]
+            if us % 1000000 == 0:
+                waits.append(strings.intern(str(us // 1000000)))
+            else:
+                waits.append(strings.intern(str(us / 1000000)))
+        dic = dict()
+        for i in range(header[6]):
+            name, count = struct.unpack("<HH", f.read(4))
+            buf = f.read(count * _INSTR_SIZE)
+            code = node.Node(strings)
+            for j in range(count):
+                op, a, b = struct.unpack_from(_INSTR, buf, j * _INSTR_SIZE)
+                if op == node.OP_WAIT:
+                    a = waits[a]
+                code.append(op, a, b)
+            dic[strings.items[name]] = code
+        strings.seal()
+        n = struct.unpack("<I", f.read(4))[0]
+        meta = json.loads(str(f.read(n), "utf-8"))
+        return dic, meta["publish"], meta["paras"]
+    except Exception:
+        return None
+    finally:
+        f.close()
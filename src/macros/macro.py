@@ -1,14 +1,16 @@
-from macros import node
+from macros import node, image
 import os
 import io
-import time
-import random
+import gc
+import json
+import binascii
 
-random.seed(time.time())
 _S_IFDIR = const(16384)
 _MACRO_BASE_PATH = "/resources/macros"
 _MACRO_EXT = ".m"
-_FINISHED_LINE = "0000000"
+_INDEX_FILE = "/resources/macros.idx"
+_MIN_FREE_MEMORY = const(65536)
+_FINISHED_LINE = node.FINISHED_LINE
 
 class Macro(object):
     def __new__(cls, *args, **kwargs):
@@ -23,36 +25,125 @@ class Macro(object):
             Macro._first = False
             self._publish = []
             self._default_paras = dict()
-            self._dic_macros = self._get_macros()
+            self._macro_files = dict()
+            self._dic_macros = dict()
+            self._loaded = []
+            self._loaded_names = dict()
+            self._summaries = dict()
+            self._deps = dict()
+            self._resolved = []
+            self._catalog = b"[]"
+            self._catalog_etag = ""
+            self._load_index()
 
     def get_node(self, name: str) -> node.Node:
         try:
-            macro_name = name
-            for p in self._publish:
-                if p.get("summary") == name:
-                    macro_name = p.get("name")
+            macro_name = self._summaries.get(name, name)
+            filename = self._macro_files.get(macro_name)
+            if filename != None:
+                self._load_namespace(filename)
             return (self._dic_macros.get(macro_name),self._default_paras.get(macro_name))
         except:
             return None
 
-    def _get_macros(self) -> dict:
-        dic_action_lines = dict()
-        macros = self._walk_macro_files()
-        for macro in macros:
-            dic_action_lines = self._load_file(macro, dic_action_lines)
-        dic_macros = dict()
-        for key in dic_action_lines.keys():
-            rows = dic_action_lines.get(key)
-            if rows != None and len(rows) < 1:
+    def has_macro(self, name: str) -> bool:
+        return self._summaries.get(name, name) in self._macro_files
+
+    def catalog(self):
+        return self._catalog, self._catalog_etag
+
+    def _load_index(self):
+        old = dict()
+        try:
+            f = open(_INDEX_FILE, "rt")
+            old = json.load(f)
+            f.close()
+        except:
+            pass
+        index = dict()
+        changed = False
+        for filename in self._walk_macro_files():
+            stamp = list(image.source_stamp(filename))
+            entry = old.get(filename)
+            if entry == None or entry.get("stamp") != stamp:
+                ret = self._load_file(filename)
+                entry = dict({"stamp": stamp, "macros": list(ret[0].keys()), "publish": ret[1], "paras": ret[2]})
+                changed = True
+            index[filename] = entry
+            for name in entry["macros"]:
+                self._macro_files[name] = filename
+            self._publish.extend(entry["publish"])
+            for p in entry["publish"]:
+                self._summaries[p["summary"]] = p["name"]
+            self._default_paras.update(entry["paras"])
+        if changed or len(index) != len(old):
+            try:
+                f = open(_INDEX_FILE, "wt")
+                json.dump(index, f)
+                f.close()
+            except OSError:
+                pass
+        # 发布列表只在启动时序列化一次，之后直接返回缓存的JSON
+        self._catalog = json.dumps(self._publish, separators=(',', ':')).encode("utf-8")
+        self._catalog_etag = '"{:08x}"'.format(binascii.crc32(self._catalog) & 0xffffffff)
+
+    def _load_namespace(self, filename, required=None):
+        if required == None:
+            required = []
+        elif filename in required:
+            return
+        required.append(filename)
+        if filename in self._loaded:
+            if self._loaded[-1] != filename:
+                self._loaded.remove(filename)
+                self._loaded.append(filename)
+            if filename in self._resolved:
+                return
+        else:
+            self._release_memory(required)
+            dic = self._load_file(filename)[0]
+            deps = []
+            for key in dic.keys():
+                for target in dic[key].targets():
+                    dep = self._macro_files.get(target)
+                    if dep != None and dep != filename and dep not in deps:
+                        deps.append(dep)
+                self._dic_macros[key] = dic[key]
+            self._loaded_names[filename] = list(dic.keys())
+            self._deps[filename] = deps
+            self._loaded.append(filename)
+            dic = None
+        for dep in self._deps[filename]:
+            self._load_namespace(dep, required)
+        # 依赖的命名空间都已加载，跳转目标解析为Node引用，运行时不再按名称查找
+        for key in self._loaded_names[filename]:
+            self._dic_macros[key].resolve(self._dic_macros)
+        self._resolved.append(filename)
+
+    def _unload_namespace(self, filename):
+        for key in self._loaded_names.pop(filename, []):
+            self._dic_macros.pop(key, None)
+        self._loaded.remove(filename)
+        self._deps.pop(filename, None)
+        if filename in self._resolved:
+            self._resolved.remove(filename)
+        # 引用了被卸载命名空间的Node清除跳转引用，避免旧Node无法释放，下次加载时重新解析
+        for f in self._loaded:
+            if filename in self._deps[f] and f in self._resolved:
+                self._resolved.remove(f)
+                for key in self._loaded_names[f]:
+                    self._dic_macros[key].links = None
+
+    def _release_memory(self, required: list):
+        gc.collect()
+        i = 0
+        while i < len(self._loaded) and gc.mem_free() < _MIN_FREE_MEMORY:
+            filename = self._loaded[i]
+            if filename in required:
+                i += 1
                 continue
-            action = None
-            for row in dic_action_lines.get(key):
-                if action == None:
-                    action = node.Node(row)
-                else:
-                    action = action.append(row)
-            dic_macros[key] = action.head
-        return dic_macros
+            self._unload_namespace(filename)
+            gc.collect()
 
     def _walk_macro_files(self, base=_MACRO_BASE_PATH):
         ret = []
@@ -66,11 +157,26 @@ class Macro(object):
                 ret.extend(self._walk_macro_files(path))
         return ret
 
-    def _load_file(self, filename, dic=dict()) -> dict:
+    def _load_file(self, filename):
+        img = image.load(filename)
+        if img != None:
+            return img
+        dic, publish, paras = self._parse_file(filename)
+        image.dump(filename, dic, publish, paras)
+        strings = node.Pool()
+        for key in dic.keys():
+            code = node.Node(strings)
+            for row in dic[key]:
+                code.append_row(row)
+            dic[key] = code
+        strings.seal()
+        return dic, publish, paras
+
+    def _parse_file(self, filename):
         try:
             f = open(filename, "rt")
         except:
-            return dic
+            return dict(), [], dict()
 
         file_tag = filename[len(_MACRO_BASE_PATH) + 1:(
             len(filename) - len(_MACRO_EXT))].replace("/", ".", -1) + "."
@@ -88,12 +194,19 @@ class Macro(object):
             if row.startswith("[") and row.count(".") == 0:
                 row = "[" + file_tag + row[1:]
             rows.append(row)
-        if len(rows) > 0:
-            dic = self._read_segments(rows, dic=dic, file_tag=file_tag)
         f.close()
-        return dic
+        dic = dict()
+        self._file_publish = []
+        self._file_paras = dict()
+        self._sub_count = 0
+        if len(rows) > 0:
+            dic = self._read_segments(rows, dic=dic, file_tag=file_tag, sub_tag=file_tag)
+        ret = (dic, self._file_publish, self._file_paras)
+        self._file_publish = None
+        self._file_paras = None
+        return ret
 
-    def _read_segments(self, src_rows, dic=dict(), file_tag: str = "", name: str = "") -> dict:
+    def _read_segments(self, src_rows, dic=dict(), file_tag: str = "", name: str = "", sub_tag: str = "") -> dict:
         rows = []
         sub_rows = []
         sub = False
@@ -124,14 +237,15 @@ class Macro(object):
                         if len(sub_rows) == 0:
                             sub = False
                             break
-                        sub_name = hex(random.randint(1, time.time()))
+                        self._sub_count += 1
+                        sub_name = "{}#{}".format(sub_tag, self._sub_count)
                         ends = ""
                         if index < len(row) - 1:
                             ends = row[index + 1:]
                         line = "[{}]{}".format(sub_name, ends)
                         rows.append(line)
                         dic = self._read_segments(sub_rows, dic=dic,
-                                                  file_tag="", name=sub_name)
+                                                  file_tag="", name=sub_name, sub_tag=sub_tag)
                         sub_rows = []
                         sub = False
                         break
@@ -182,9 +296,9 @@ class Macro(object):
                     p2 =s[1]
                 paras.append(dict({"name":p1,"summary":p2,"default":v}))
                 dic_paras[p1] = v
-            self._default_paras[name] = dic_paras
+            self._file_paras[name] = dic_paras
             
         if summary != "":
-            self._publish.append(dict({"name":name,"summary":summary,"loop":loop,"paras":paras}))
+            self._file_publish.append(dict({"name":name,"summary":summary,"loop":loop,"paras":paras}))
         
         return name
\ No newline at end of file
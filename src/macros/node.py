@@ -1,28 +1,125 @@
+import array
+
+FINISHED_LINE = "0000000"
+
+OP_END = const(0)
+OP_PRESS = const(1)
+OP_HOLD = const(2)
+OP_WAIT = const(3)
+OP_JUMP = const(4)
+OP_REPEAT = const(5)
+OP_COND = const(6)
+OP_EXEC = const(7)
+OP_BODY = const(8)
+
+
+class Pool(object):
+    def __init__(self):
+        self.items = []
+        self._index = dict()
+
+    def intern(self, v) -> int:
+        i = self._index.get(v)
+        if i == None:
+            i = len(self.items)
+            self._index[v] = i
+            self.items.append(v)
+        return i
+
+    def seal(self):
+        # 加载完成后不再追加字符串，释放查找用的字典
+        self._index = None
+
+
+def parse_row(row: str):
+    if row == FINISHED_LINE:
+        return OP_END, None, None
+    elif row == "body:":
+        return OP_BODY, None, None
+    elif row.startswith("EXEC>"):
+        return OP_EXEC, row[5:], None
+    elif row.startswith("["):
+        splits = row.split("]")
+        if splits[1].startswith("?"):
+            return OP_COND, splits[0][1:], splits[1][1:]
+        elif splits[1].startswith("*"):
+            return OP_REPEAT, splits[0][1:], splits[1][1:]
+        return OP_JUMP, splits[0][1:], None
+    try:
+        float(row)
+        return OP_WAIT, row, None
+    except ValueError:
+        pass
+    if row.endswith("->~"):
+        return OP_HOLD, row, None
+    return OP_PRESS, row, None
+
+
+def split_template(text: str) -> tuple:
+    # 拆分为 文本,变量,文本,变量,...,文本，偶数位为原文，奇数位为变量表达式
+    ret = []
+    parts = text.split("-*")
+    literal = parts[0]
+    for part in parts[1:]:
+        if "*-" in part:
+            i = part.index("*-")
+            ret.append(literal)
+            ret.append(part[:i])
+            literal = part[i + 2:]
+        else:
+            literal += "-*" + part
+    ret.append(literal)
+    return tuple(ret)
+
+
 class Node(object):
-    def __init__(self, action_line: str):
-        self._head: Node = self
-        self._next: Node = None
-        self._action_line: str = action_line
-
-    def append(self, action_line: str):
-        node = self
-        while True:
-            if node._next == None:
-                break
-            else:
-                node = node._next
-        node._next = Node(action_line)
-        node._next._head = node._head
-        return node._next
-
-    @property
-    def head(self):
-        return self._head
-
-    @property
-    def next(self):
-        return self._next
-
-    @property
-    def action(self):
-        return self._action_line
+    def __init__(self, strings: Pool):
+        self._pool = strings
+        self.strings = strings.items
+        self.ops = bytearray()
+        self.args = array.array("H")
+        self.templates = None
+        # 跳转目标Node直接引用，与ops下标对应，加载时由resolve填充，None表示未解析
+        self.links = None
+
+    def append(self, op: int, a: int = 0, b: int = 0):
+        if (op == OP_PRESS or op == OP_HOLD) and "-*" in self.strings[a]:
+            t = split_template(self.strings[a])
+            if len(t) > 1:
+                if self.templates == None:
+                    self.templates = dict()
+                self.templates[len(self.ops)] = t
+        self.ops.append(op)
+        self.args.append(a)
+        self.args.append(b)
+
+    def append_row(self, row: str):
+        op, s1, s2 = parse_row(row)
+        a = 0
+        b = 0
+        if s1 != None:
+            a = self._pool.intern(s1)
+        if s2 != None:
+            b = self._pool.intern(s2)
+        self.append(op, a, b)
+
+    def targets(self):
+        ret = []
+        for pc in range(len(self.ops)):
+            op = self.ops[pc]
+            if op == OP_JUMP or op == OP_COND or op == OP_REPEAT:
+                ret.append(self.strings[self.args[pc * 2]])
+        return ret
+
+    def resolve(self, nodes: dict):
+        links = None
+        for pc in range(len(self.ops)):
+            op = self.ops[pc]
+            if op == OP_JUMP or op == OP_COND or op == OP_REPEAT:
+                if links == None:
+                    links = [None] * len(self.ops)
+                links[pc] = nodes.get(self.strings[self.args[pc * 2]])
+        self.links = links
+
+    def __len__(self):
+        return len(self.ops)
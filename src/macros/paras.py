@@ -1,29 +1,50 @@
+_exec_cache = dict()
+_eval_cache = dict()
+
+
+def _compile(cache: dict, key: str, mode: str):
+    code = cache.get(key)
+    if code == None:
+        try:
+            code = compile(key.replace("|space|", " ", -1), "<macro>", mode)
+        except SyntaxError:
+            code = False
+        cache[key] = code
+    return code
+
+
 class Paras(object):
     def __init__(self, default_para: dict,para:dict):
-        self._paras = None
+        self._namespace = None
         if default_para != None:
-            self._paras = default_para.copy()
+            self._namespace = default_para.copy()
         else:
-            self._paras = dict()
+            self._namespace = dict()
 
         if para != None:
             for key in para.keys():
                 v = para[key]
                 if v != None and v != "":
-                    self._paras[key] = v
-        locals().update(self._paras)
+                    self._namespace[key] = v
+
+    def _eval(self, key):
+        code = _compile(_eval_cache, key, "eval")
+        if not code:
+            raise SyntaxError(key)
+        return eval(code, self._namespace)
 
     def exec_str(self,key):
+        code = _compile(_exec_cache, key, "exec")
+        if not code:
+            return
         try:
-            key = key.replace("|space|", " ", -1)
-            exec(key)
+            exec(code, self._namespace)
         except:
             return
 
     def get_bool(self,key)->bool:
         try:
-            key = key.replace("|space|", " ", -1)
-            v = eval(key)
+            v = self._eval(key)
         except:
             return False
         if v == None:
@@ -36,8 +57,7 @@ class Paras(object):
     
     def get_int(self,key)->int:
         try:
-            key = key.replace("|space|", " ", -1)
-            v = eval(key)
+            v = self._eval(key)
         except:
             return 0
 
@@ -53,8 +73,7 @@ class Paras(object):
 
     def get_float(self, key) -> float:
         try:
-            key = key.replace("|space|", " ", -1)
-            v = eval(key)
+            v = self._eval(key)
         except:
             return 0
 
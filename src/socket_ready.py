@@ -0,0 +1,51 @@
+import select
+import asyncio
+from asyncio import core
+
+# 不支持poll时轮询socket的间隔
+_Poll_Interval_ms = 10
+
+_pollable = None
+
+
+def pollable(sock) -> bool:
+    # CircuitPython 7.3/8.0的socketpool socket不能注册到select.poll，第一次使用时检测一次
+    global _pollable
+    if _pollable == None:
+        try:
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            poller.poll(0)
+            poller.unregister(sock)
+            _pollable = True
+        except:
+            _pollable = False
+    return _pollable
+
+
+async def _wait(sock, write: bool, timeout_ms: int) -> bool:
+    if not pollable(sock):
+        # 退回为按间隔轮询，调用方继续用非阻塞操作并处理EAGAIN
+        await asyncio.sleep_ms(_Poll_Interval_ms)
+        return True
+    if write:
+        waiter = core._io_queue.queue_write(sock)
+    else:
+        waiter = core._io_queue.queue_read(sock)
+    if timeout_ms < 0:
+        await waiter
+        return True
+    try:
+        await asyncio.wait_for_ms(waiter, timeout_ms)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def wait_readable(sock, timeout_ms: int = -1) -> bool:
+    # 返回False表示超时；不支持poll时只等待一个轮询间隔，返回True不代表一定有数据
+    return await _wait(sock, False, timeout_ms)
+
+
+async def wait_writable(sock, timeout_ms: int = -1) -> bool:
+    return await _wait(sock, True, timeout_ms)
@@ -0,0 +1,86 @@
+import json
+import struct
+
+# 连接建立后客户端发送的第一个字节，为该值时进入分帧模式，否则按原有JSON方式处理
+PROTOCOL_VERSION = const(0x01)
+
+MSG_PING = const(0x00)
+MSG_JSON = const(0x01)
+MSG_STATE = const(0x02)
+
+_HEADER = ">BH"
+_HEADER_SIZE = const(3)
+MAX_PAYLOAD = const(1024)
+
+# 实时状态：按键位域(u32) + 左摇杆x,y + 右摇杆x,y(int8)
+_STATE = ">Ibbbb"
+STATE_SIZE = const(8)
+STATE_BUTTONS = (
+    "Y", "B", "A", "X", "L", "R", "ZL", "ZR",
+    "MINUS", "PLUS", "LPRESS", "RPRESS", "HOME", "CAPTURE",
+    "TOP", "BOTTOM", "LEFT", "RIGHT",
+)
+
+
+def encode_frame(msg_type: int, payload: bytes) -> bytes:
+    return struct.pack(_HEADER, msg_type, len(payload)) + payload
+
+
+def error_frame(message: str) -> bytes:
+    return encode_frame(MSG_JSON, json.dumps({"error": message}).encode("utf-8"))
+
+
+def state_to_action_line(payload: bytes) -> str:
+    if len(payload) != STATE_SIZE:
+        raise ValueError("invalid state size")
+    buttons, lx, ly, rx, ry = struct.unpack(_STATE, payload)
+    parts = []
+    for i in range(len(STATE_BUTTONS)):
+        if buttons & (1 << i):
+            parts.append(STATE_BUTTONS[i])
+    if lx != 0 or ly != 0:
+        parts.append("LSTICK@{},{}".format(lx, ly))
+    if rx != 0 or ry != 0:
+        parts.append("RSTICK@{},{}".format(rx, ry))
+    return "|".join(parts)
+
+
+class FrameError(ValueError):
+    pass
+
+
+class FrameDecoder(object):
+    def __init__(self):
+        self._buffer = bytearray()
+        self.framed = None
+        # 长度字段超出上限后无法再确定下一帧的位置，记录原因，之后的数据全部忽略
+        self.error = None
+
+    def feed(self, data) -> list:
+        frames = []
+        if self.framed == False or self.error != None:
+            return frames
+        self._buffer.extend(data)
+        buf = self._buffer
+        offset = 0
+        if self.framed == None:
+            if len(buf) == 0:
+                return frames
+            self.framed = buf[0] == PROTOCOL_VERSION
+            if not self.framed:
+                self._buffer = bytearray()
+                return frames
+            offset = 1
+        while len(buf) - offset >= _HEADER_SIZE:
+            msg_type, length = struct.unpack_from(_HEADER, buf, offset)
+            if length > MAX_PAYLOAD:
+                self.error = "frame too large"
+                break
+            end = offset + _HEADER_SIZE + length
+            if len(buf) < end:
+                break
+            frames.append((msg_type, bytes(buf[offset + _HEADER_SIZE:end])))
+            offset = end
+        if offset > 0:
+            self._buffer = buf[offset:]
+        return frames
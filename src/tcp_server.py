@@ -1,14 +1,17 @@
-import io
 import macros
-import time
 import asyncio
 from errno import EAGAIN,ENOTCONN
 import wifi
 import socketpool
 import customize.wifi_connect as wifi_connect
 import customize.task_manager as task_manager
+import tcp_protocol
+import socket_ready
+from adafruit_ticks import ticks_ms, ticks_diff
 
 MAXBUF = 1024
+_Ping_Interval_ms = 10000
+_Wifi_Check_Interval_ms = 5000
 
 class TcpServer(object):
     def __new__(cls, *args, **kwargs):
@@ -22,7 +25,8 @@ class TcpServer(object):
             TcpServer._first = False
             self._on_message = None
             self._socket: socketpool.Socket = None
-            self._clients = []
+            self._sessions = dict()
+            self._ping_started = False
 
     async def start_serve(self,port):
         tm = task_manager.TaskManager()
@@ -33,7 +37,7 @@ class TcpServer(object):
             if self._socket != None:
                 self._socket.close()
                 self._socket: socketpool.Socket = None
-                self._clients = []
+                self._sessions = dict()
             try:
                 wifi_connect.reconnect()
             except:
@@ -46,13 +50,22 @@ class TcpServer(object):
         self._socket.setblocking(False)
         self._socket.bind((str(HOST), port))
         self._socket.listen(1000)
+        if not self._ping_started:
+            self._ping_started = True
+            tm.create_task(self._ping_loop())
 
+        last_check = ticks_ms()
         while True:
-            await asyncio.sleep_ms(10)
-            if wifi_connect.ip_address() == None:
-                 tm.create_task(self.start_serve(port))
-                 self._socket.close()
-                 return
+            # 监听socket可读（有新连接）时才被唤醒，固件不支持poll时按间隔轮询accept；定期检查WIFI状态
+            ready = await socket_ready.wait_readable(self._socket, _Wifi_Check_Interval_ms)
+            if not ready or ticks_diff(ticks_ms(), last_check) >= _Wifi_Check_Interval_ms:
+                last_check = ticks_ms()
+                if wifi_connect.ip_address() == None:
+                    tm.create_task(self.start_serve(port))
+                    self._socket.close()
+                    return
+                if not ready:
+                    continue
             try:
                 client = None
                 try:
@@ -62,49 +75,103 @@ class TcpServer(object):
                     if e.errno != EAGAIN:
                         raise e
                 if client != None:
-                    self._clients.append(client)
                     client.setblocking(False)
                     tm.create_task(self.tcp_handler(client))
             except OSError as e:
                 if client != None:
-                    self._clients.remove(client)
+                    client.close()
+
+    def _process(self, client_socket, decoder, data):
+        frames = decoder.feed(data)
+        if not decoder.framed:
+            ret = macros.add_joystick_task(str(data, 'utf-8'), id(client_socket))
+            if ret and ret != "":
+                client_socket.send(ret.encode('utf-8'))
+            return
+        for frame in frames:
+            ret = None
+            if frame[0] == tcp_protocol.MSG_STATE:
+                try:
+                    line = tcp_protocol.state_to_action_line(frame[1])
+                except ValueError as e:
+                    # 单帧内容错误只丢弃该帧并回复错误，连接继续使用
+                    client_socket.send(tcp_protocol.error_frame(str(e)))
+                    continue
+                macros.add_realtime_action(line, id(client_socket))
+            elif frame[0] == tcp_protocol.MSG_JSON:
+                ret = macros.add_joystick_task(frame[1].decode('utf-8'), id(client_socket))
+            if ret and ret != "":
+                client_socket.send(tcp_protocol.encode_frame(tcp_protocol.MSG_JSON, ret.encode('utf-8')))
+        if decoder.error != None:
+            # 帧长度错误后数据流已无法继续解析，回复错误后关闭连接
+            print("TCP连接数据格式错误：{}".format(decoder.error))
+            client_socket.send(tcp_protocol.error_frame(decoder.error))
+            raise tcp_protocol.FrameError(decoder.error)
+
+    async def _ping_loop(self):
+        # 所有连接共用一个心跳任务，连接10秒没有收到数据时发送ping
+        while True:
+            await asyncio.sleep_ms(_Ping_Interval_ms // 2)
+            now = ticks_ms()
+            for key in self._sessions:
+                session = self._sessions[key]
+                if ticks_diff(now, session[2]) < _Ping_Interval_ms:
+                    continue
+                session[2] = now
+                try:
+                    if session[1].framed:
+                        session[0].send(tcp_protocol.encode_frame(tcp_protocol.MSG_PING, b""))
+                    else:
+                        session[0].send("ping".encode('utf-8'))
+                except OSError:
+                    pass
 
     async def tcp_handler(self, client_socket):
+        # 每个连接一块固定的接收缓冲区，按偏移写入；任务在socket可读之前一直挂起
         buf = bytearray(MAXBUF)
-        last_active_ts = time.monotonic()
+        view = memoryview(buf)
+        decoder = tcp_protocol.FrameDecoder()
+        session = [client_socket, decoder, ticks_ms()]
+        self._sessions[id(client_socket)] = session
         try:
-            size = 0
-            while True:
-                await asyncio.sleep_ms(1)
-                if time.monotonic() - last_active_ts > 10:
-                    client_socket.send("ping".encode('utf-8'))
-                    last_active_ts = time.monotonic()
-                bytes_io = io.BytesIO()
+            closed = False
+            while not closed:
+                await socket_ready.wait_readable(client_socket)
+                length = 0
+                pending = None
                 while True:
+                    if length == MAXBUF:
+                        if decoder.framed or (decoder.framed == None and buf[0] == tcp_protocol.PROTOCOL_VERSION):
+                            # 分帧模式下解码器会缓存不完整的帧，缓冲区写满时先处理已收到的数据
+                            session[2] = ticks_ms()
+                            self._process(client_socket, decoder, view)
+                        else:
+                            # 原有JSON方式读到EAGAIN为止的数据是一条完整命令，写满时先累积起来
+                            if pending == None:
+                                pending = bytearray()
+                            pending.extend(buf)
+                        length = 0
                     try:
-                        size = client_socket.recv_into(buf,MAXBUF)
-                        bytes_io.write(buf[:size])
+                        size = client_socket.recv_into(view[length:],MAXBUF - length)
                     except OSError as e:
                         if e.errno == EAGAIN:
                             break
                         elif e.errno == ENOTCONN:
-                            data = bytes_io.getvalue()
-                            bytes_io.close()
-                            if len(data) > 0 :
-                                last_active_ts = time.monotonic()
-                                data = data.decode('utf-8')
-                                ret = macros.add_joystick_task(data)
-                            self._clients.remove(client_socket)
-                            return
+                            closed = True
+                            break
                         raise e
-                data = bytes_io.getvalue()
-                bytes_io.close()
-                if len(data) > 0 :
-                    last_active_ts = time.monotonic()
-                    data = data.decode('utf-8')
-                    ret = macros.add_joystick_task(data)
-                    if ret and ret != "":
-                        client_socket.send(ret.encode('utf-8'))
-                    # client_socket.send(data.encode('utf-8'))
+                    if size == 0:
+                        closed = True
+                        break
+                    length += size
+                if pending != None:
+                    pending.extend(view[:length])
+                    session[2] = ticks_ms()
+                    self._process(client_socket, decoder, pending)
+                elif length > 0 :
+                    session[2] = ticks_ms()
+                    self._process(client_socket, decoder, view[:length])
         except:
-            self._clients.remove(client_socket)
\ No newline at end of file
+            pass
+        self._sessions.pop(id(client_socket), None)
+        client_socket.close()
\ No newline at end of file
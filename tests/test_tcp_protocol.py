@@ -0,0 +1,86 @@
+# 在PC上运行：python -m pytest tests
+import builtins
+import json
+import os
+import struct
+import sys
+import types
+
+import pytest
+
+builtins.const = lambda x: x
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+# tcp_server依赖的设备模块用空模块代替，只测试数据处理部分
+for _name in ("wifi", "socketpool", "customize", "customize.wifi_connect", "customize.task_manager",
+              "socket_ready", "adafruit_ticks", "macros"):
+    sys.modules.setdefault(_name, types.ModuleType(_name))
+sys.modules["socketpool"].Socket = object
+sys.modules["adafruit_ticks"].ticks_ms = lambda: 0
+sys.modules["adafruit_ticks"].ticks_diff = lambda a, b: a - b
+
+import tcp_protocol
+import tcp_server
+
+
+class _Client(object):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(bytes(data))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    ret = []
+    monkeypatch.setattr(tcp_server.macros, "add_realtime_action", lambda line, source: ret.append(("state", line)), raising=False)
+    monkeypatch.setattr(tcp_server.macros, "add_joystick_task", lambda data, source: ret.append(("json", data)) or "", raising=False)
+    return ret
+
+
+def _state(buttons):
+    return tcp_protocol.encode_frame(tcp_protocol.MSG_STATE, struct.pack(">Ibbbb", buttons, 0, 0, 0, 0))
+
+
+def _replies(client):
+    ret = []
+    for data in client.sent:
+        decoder = tcp_protocol.FrameDecoder()
+        decoder.framed = True
+        for frame in decoder.feed(data):
+            ret.append(json.loads(frame[1]))
+    return ret
+
+
+def test_bad_state_frame_is_skipped(calls):
+    client = _Client()
+    decoder = tcp_protocol.FrameDecoder()
+    data = bytes([tcp_protocol.PROTOCOL_VERSION])
+    data += tcp_protocol.encode_frame(tcp_protocol.MSG_STATE, b"\x00\x01\x02")
+    data += _state(4)
+    data += tcp_protocol.encode_frame(tcp_protocol.MSG_JSON, b'{"stop":true}')
+    tcp_server.TcpServer()._process(client, decoder, data)
+    assert calls == [("state", "A"), ("json", '{"stop":true}')]
+    assert "error" in _replies(client)[0]
+    assert decoder.error == None
+
+
+def test_oversized_frame_replies_before_closing(calls):
+    client = _Client()
+    decoder = tcp_protocol.FrameDecoder()
+    data = bytes([tcp_protocol.PROTOCOL_VERSION]) + _state(4)
+    data += struct.pack(">BH", tcp_protocol.MSG_JSON, tcp_protocol.MAX_PAYLOAD + 1)
+    with pytest.raises(tcp_protocol.FrameError):
+        tcp_server.TcpServer()._process(client, decoder, data)
+    assert calls == [("state", "A")]
+    assert _replies(client) == [{"error": "frame too large"}]
+    assert decoder.feed(_state(4)) == []
+
+
+def test_frames_split_across_reads():
+    decoder = tcp_protocol.FrameDecoder()
+    data = bytes([tcp_protocol.PROTOCOL_VERSION]) + _state(1) + _state(2)
+    assert decoder.feed(data[:6]) == []
+    frames = decoder.feed(data[6:])
+    assert [tcp_protocol.state_to_action_line(f[1]) for f in frames] == ["Y", "B"]
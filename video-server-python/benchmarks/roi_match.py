@@ -0,0 +1,62 @@
+# 对比整帧与识别区域内模板匹配的单帧耗时，在video-server-python目录下运行：python -m benchmarks.roi_match
+import time
+import cv2
+import numpy as np
+from recognize.opencv.opencv import OpenCV,load_config
+
+_Width = 960
+_Height = 540
+_Rounds = 300
+# 60fps下每帧可用时间
+_Frame_Budget_Ms = 1000 / 60
+
+
+def _frames(template,area):
+    # 随机噪声帧，一半在识别区域贴上模板
+    ret = []
+    for i in range(8):
+        image = np.random.randint(0,256,(_Height,_Width,3),dtype=np.uint8)
+        if i % 2 == 0:
+            image[area["y"]:area["y"] + template.shape[0],area["x"]:area["x"] + template.shape[1]] = template
+        ret.append(image)
+    return ret
+
+
+def _measure(frames,gray_template,match):
+    spans = []
+    for i in range(_Rounds):
+        image = frames[i % len(frames)]
+        start = time.perf_counter_ns()
+        match(image,gray_template)
+        spans.append(time.perf_counter_ns() - start)
+    spans.sort()
+    return spans[len(spans) // 2],spans[len(spans) * 99 // 100]
+
+
+def _print(tag,result):
+    median,p99 = result
+    print("{}：中位数 {:.2f}ms，P99 {:.2f}ms，占60fps单帧时间 {:.1f}%".format(
+        tag,median / 1000000,p99 / 1000000,median / 1000000 / _Frame_Budget_Ms * 100))
+
+
+def run():
+    config = load_config("battle_shiny")
+    area = config["area"]
+    template = cv2.imread(config["image"])
+    gray_template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    frames = _frames(template,area)
+    opencv = OpenCV(None,None,None,config=config)
+
+    def full(image,gray_template):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.minMaxLoc(cv2.matchTemplate(gray, gray_template, cv2.TM_CCOEFF_NORMED))
+
+    def roi(image,gray_template):
+        return opencv.match(image)
+
+    _print("整帧匹配",_measure(frames,gray_template,full))
+    _print("区域匹配",_measure(frames,gray_template,roi))
+
+
+if __name__ == "__main__":
+    run()
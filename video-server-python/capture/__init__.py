@@ -1,5 +1,6 @@
 from capture import video
 import datatype.device as device
+import datatype.frame_bus as frame_bus
 
-def capture_video(pipe,dev:device.VideoDevice,display_width,display_height,display_fps):
-	video.Video().run(pipe,dev,display_width,display_height,display_fps)
+def capture_video(bus:frame_bus.FrameBus,dev:device.VideoDevice,display_width,display_height,display_fps):
+	video.Video().run(bus.publisher(frame_bus.TOPIC_CAPTURE),dev,display_width,display_height,display_fps)
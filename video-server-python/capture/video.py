@@ -1,4 +1,6 @@
 import datatype.device as device
+import datatype.frame_ring as frame_ring
+import datatype.frame_stats as frame_stats
 import cv2
 import time
 from PySide6.QtMultimedia import (QMediaDevices)
@@ -36,10 +38,10 @@ class Video():
     #     )
     #     return process
         
-    def run(self,pipe,dev:device.VideoDevice,display_width,display_height,display_fps):
+    def run(self,ring:frame_ring.FrameRing,dev:device.VideoDevice,display_width,display_height,display_fps):
         if dev == None:
             return
-        self.capture(pipe,dev,display_width,display_height,display_fps)
+        self.capture(ring,dev,display_width,display_height,display_fps)
         # process = self._start_ffmpeg(dev,display_width,display_height,display_fps)
         # while True:
         #     frame_bytes = process.stdout.read(display_width * display_height * 3)
@@ -51,7 +53,7 @@ class Video():
         #         break
         # process.terminate()
 
-    def capture(self,pipe,dev:device.VideoDevice,display_width,display_height,display_fps:int):
+    def capture(self,ring:frame_ring.FrameRing,dev:device.VideoDevice,display_width,display_height,display_fps:int):
         available_cameras = QMediaDevices.videoInputs()
         cap = cv2.VideoCapture(dev.index,cv2.CAP_DSHOW)
         cap.set(cv2.CAP_PROP_FRAME_WIDTH,dev.width)
@@ -62,13 +64,23 @@ class Video():
             display_fps = dev.fps
         last_cap_monotonic = time.monotonic()
         min_interval = 1 / display_fps
+        stats = frame_stats.StageStats("采集")
+        reporter = frame_stats.StatsReporter((stats,))
         while cap.isOpened():
+            # 采集阶段的延迟从开始读取摄像头计算，包括等待下一帧、解码和缩放
+            read_ts = time.monotonic_ns()
             ret, frame = cap.read()
-            now = time.monotonic()
+            ts = time.monotonic_ns()
+            now = ts / 1000000000
             if now - last_cap_monotonic >= min_interval:
                 last_cap_monotonic = now
-                frame = cv2.resize(frame, (display_width, display_height))
-                if pipe.writable:
-                    pipe.send(frame.tobytes())
+                # 直接缩放到共享内存槽位中，不再序列化和复制
+                cv2.resize(frame, (display_width, display_height), dst=ring.acquire())
+                ring.commit(ts)
+                stats.record(read_ts)
+            else:
+                # 超过显示帧率被跳过的帧
+                stats.drop()
+            reporter.tick()
         cap.release()
         cv2.destroyAllWindows()
\ No newline at end of file
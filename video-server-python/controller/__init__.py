@@ -4,6 +4,7 @@ import socket
 import datatype.device as device
 
 from controller.send_order import OrderSender
+from controller import protocol
 
 _log_udp_port = 41001
 
@@ -32,7 +33,12 @@ async def process_inputs(sender,action_queue:multiprocessing.Queue):
 				continue
 			break
 		msg = action.message
-		await sender.add_order(msg.encode("utf-8"))
 		if action.type == "realtime" and action.get("realtime") != "action_start" and  action.get("realtime") != "action_stop":
+			state = protocol.action_line_to_state(action.get("realtime"))
+			if state != None:
+				await sender.add_order(protocol.encode_frame(protocol.MSG_STATE,state))
+			else:
+				await sender.add_order(protocol.encode_frame(protocol.MSG_JSON,msg.encode("utf-8")))
 			continue
+		await sender.add_order(protocol.encode_frame(protocol.MSG_JSON,msg.encode("utf-8")))
 		await send_log("发送命令：" + msg)
\ No newline at end of file
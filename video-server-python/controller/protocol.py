@@ -0,0 +1,74 @@
+import struct
+
+# 与设备端src/tcp_protocol.py保持一致
+PROTOCOL_VERSION = 0x01
+
+MSG_PING = 0x00
+MSG_JSON = 0x01
+MSG_STATE = 0x02
+
+_HEADER = ">BH"
+_HEADER_SIZE = 3
+_STATE = ">Ibbbb"
+STATE_BUTTONS = (
+    "Y", "B", "A", "X", "L", "R", "ZL", "ZR",
+    "MINUS", "PLUS", "LPRESS", "RPRESS", "HOME", "CAPTURE",
+    "TOP", "BOTTOM", "LEFT", "RIGHT",
+)
+
+
+def encode_frame(msg_type:int,payload:bytes) -> bytes:
+    return struct.pack(_HEADER, msg_type, len(payload)) + payload
+
+
+def _axis(s:str):
+    v = int(float(s))
+    if v < -128 or v > 127:
+        return None
+    return v
+
+
+def action_line_to_state(action_line:str):
+    # 只包含按键和摇杆的实时命令可以编码为二进制状态，其它情况返回None，继续使用JSON
+    buttons = 0
+    axes = [0, 0, 0, 0]
+    for token in action_line.upper().split("|"):
+        token = token.strip()
+        if token == "":
+            continue
+        if token in STATE_BUTTONS:
+            buttons |= 1 << STATE_BUTTONS.index(token)
+            continue
+        splits = token.split("@")
+        if len(splits) != 2 or (splits[0] != "LSTICK" and splits[0] != "RSTICK"):
+            return None
+        coordinate = splits[1].split(",")
+        if len(coordinate) != 2:
+            return None
+        try:
+            x = _axis(coordinate[0])
+            y = _axis(coordinate[1])
+        except ValueError:
+            return None
+        if x == None or y == None:
+            return None
+        i = 0 if splits[0] == "LSTICK" else 2
+        axes[i] = x
+        axes[i + 1] = y
+    return struct.pack(_STATE, buttons, axes[0], axes[1], axes[2], axes[3])
+
+
+class FrameReader(object):
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self,data:bytes) -> list:
+        self._buffer.extend(data)
+        frames = []
+        while len(self._buffer) >= _HEADER_SIZE:
+            msg_type, length = struct.unpack_from(_HEADER, self._buffer, 0)
+            if len(self._buffer) < _HEADER_SIZE + length:
+                break
+            frames.append((msg_type, bytes(self._buffer[_HEADER_SIZE:_HEADER_SIZE + length])))
+            del self._buffer[:_HEADER_SIZE + length]
+        return frames
@@ -1,6 +1,6 @@
 import asyncio
-from io import BytesIO
 import datatype.device as device
+from controller import protocol
 
 class OrderSender(object):
     def __init__(self,dev:device.JoystickDevice):
@@ -11,6 +11,9 @@ class OrderSender(object):
         while True:
             try:
                 reader,writer = await asyncio.open_connection(dev.host,dev.port)
+                writer.write(bytes([protocol.PROTOCOL_VERSION]))
+                await writer.drain()
+                frame_reader = protocol.FrameReader()
                 while True:
                     try:
                         await asyncio.sleep(0.2)
@@ -19,25 +22,24 @@ class OrderSender(object):
                             action = self._queue.get_nowait()
                         except:
                             pass
-                        bytes = BytesIO()
+                        frames = []
                         try:
                             while True:
                                 ret = await asyncio.wait_for(reader.read(1024),timeout=0.001)
-                                bytes.write(ret)
+                                if not ret:
+                                    raise ConnectionError("连接已断开")
+                                frames.extend(frame_reader.feed(ret))
                         except asyncio.TimeoutError:
                             pass
-                        bytes.flush()
-                        bytes.seek(0)
-                        lines = bytes.readlines()
-                        if len(lines) > 0:
-                            for line in lines:
-                                line = line.decode("utf-8").strip()
-                                if line == "" or line=="ping":
-                                    continue
-                                if self._queue_output.full():
-                                    self._queue_output.get_nowait()
-                                self._queue_output.put_nowait(line)
-                        bytes.close()
+                        for frame in frames:
+                            if frame[0] != protocol.MSG_JSON:
+                                continue
+                            line = frame[1].decode("utf-8").strip()
+                            if line == "":
+                                continue
+                            if self._queue_output.full():
+                                self._queue_output.get_nowait()
+                            self._queue_output.put_nowait(line)
 
                         if action == None:
                             continue
@@ -0,0 +1,73 @@
+import datatype.frame_ring as frame_ring
+import datatype.frame_stats as frame_stats
+
+# 订阅策略：LATEST只取最新帧（识别），BOUNDED按顺序读取但最多落后max_lag帧（显示）
+LATEST = "latest"
+BOUNDED = "bounded"
+
+TOPIC_CAPTURE = "capture"
+TOPIC_PROCESSED = "processed"
+
+
+class FrameBus(object):
+    # 在主进程中声明主题和订阅者后传给各子进程，生产者直接发布到共享内存，不经过主进程转发
+    def __init__(self,width:int,height:int,channels:int = 3,slots:int = 8):
+        self._width = width
+        self._height = height
+        self._channels = channels
+        self._slots = slots
+        self._topics = dict()
+        self._subscribers = dict()
+
+    def add_topic(self,topic:str,subscribers:tuple):
+        self._topics[topic] = frame_ring.FrameRing(self._width,self._height,self._channels,self._slots,len(subscribers))
+        self._subscribers[topic] = tuple(subscribers)
+
+    def publisher(self,topic:str) -> frame_ring.FrameRing:
+        return self._topics[topic]
+
+    def subscribe(self,topic:str,name:str,policy:str = LATEST,max_lag:int = 3,stats:frame_stats.StageStats = None):
+        # 订阅者名称对应固定的读游标，进程重启后重新订阅不会占用新的游标；stats用于统计按策略跳过的帧
+        ring = self._topics[topic]
+        if policy == LATEST:
+            max_lag = 1
+        return Subscription(ring,ring.reader(self._subscribers[topic].index(name)),max_lag,stats)
+
+    def close(self):
+        for ring in self._topics.values():
+            ring.close()
+
+
+class Subscription(object):
+    def __init__(self,ring:frame_ring.FrameRing,reader:int,max_lag:int,stats:frame_stats.StageStats = None):
+        self._ring = ring
+        self._reader = reader
+        self._max_lag = max_lag
+        self._stats = stats
+        self.received = 0
+        self.dropped = 0
+
+    def _count(self,cursor:int,seq:int):
+        if seq != None:
+            self.received += 1
+            self.dropped += seq - cursor - 1
+            if self._stats != None and seq - cursor > 1:
+                self._stats.drop(seq - cursor - 1)
+
+    def poll(self):
+        cursor = self._ring.cursor(self._reader)
+        seq,view = self._ring.read(self._reader,self._max_lag)
+        self._count(cursor,seq)
+        return seq,view
+
+    def wait(self,timeout:float = 0.1):
+        cursor = self._ring.cursor(self._reader)
+        seq,view = self._ring.wait_read(self._reader,self._max_lag,timeout)
+        self._count(cursor,seq)
+        return seq,view
+
+    def stamp(self,seq:int):
+        return self._ring.stamp(seq)
+
+    def valid(self,seq:int) -> bool:
+        return self._ring.valid(seq)
@@ -0,0 +1,184 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+
+# 共享内存布局：头部、每个槽位的帧序号、采集时间、源帧序号、每个读者的游标、帧数据
+_HEADER_SIZE = 8
+_H_WRITE_SEQ = 0
+_H_SLOTS = 1
+_H_HEIGHT = 2
+_H_WIDTH = 3
+_H_CHANNELS = 4
+_H_READERS = 5
+_H_READERS_USED = 6
+
+# 槽位正在写入
+_WRITING = -1
+
+
+class FrameRing(object):
+    def __init__(self,width:int,height:int,channels:int = 3,slots:int = 4,readers:int = 4,name:str = None):
+        self._width = width
+        self._height = height
+        self._channels = channels
+        self._slots = slots
+        self._readers = readers
+        self._frame_size = width * height * channels
+        size = (_HEADER_SIZE + slots * 3 + readers) * 8 + slots * self._frame_size
+        if name == None:
+            self._shm = shared_memory.SharedMemory(create=True,size=size)
+            self._owner = os.getpid()
+            self._cond = multiprocessing.Condition()
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = None
+        self._map()
+        if self._owner != None:
+            self._header[:] = 0
+            self._header[_H_SLOTS] = slots
+            self._header[_H_HEIGHT] = height
+            self._header[_H_WIDTH] = width
+            self._header[_H_CHANNELS] = channels
+            self._header[_H_READERS] = readers
+            self._slot_seq[:] = _WRITING
+            self._cursors[:] = 0
+
+    def _map(self):
+        buf = self._shm.buf
+        offset = 0
+        self._header = np.ndarray((_HEADER_SIZE,),dtype=np.int64,buffer=buf,offset=offset)
+        offset += _HEADER_SIZE * 8
+        self._slot_seq = np.ndarray((self._slots,),dtype=np.int64,buffer=buf,offset=offset)
+        offset += self._slots * 8
+        self._slot_ts = np.ndarray((self._slots,),dtype=np.int64,buffer=buf,offset=offset)
+        offset += self._slots * 8
+        self._slot_origin = np.ndarray((self._slots,),dtype=np.int64,buffer=buf,offset=offset)
+        offset += self._slots * 8
+        self._cursors = np.ndarray((self._readers,),dtype=np.int64,buffer=buf,offset=offset)
+        offset += self._readers * 8
+        self._frames = np.ndarray((self._slots,self._height,self._width,self._channels),dtype=np.uint8,buffer=buf,offset=offset)
+        self._next_seq = int(self._header[_H_WRITE_SEQ]) + 1
+
+    # 传给子进程时只传递共享内存名称和尺寸，子进程中重新映射
+    def __getstate__(self):
+        return (self._shm.name,self._width,self._height,self._channels,self._slots,self._readers,self._cond)
+
+    def __setstate__(self,state):
+        name,width,height,channels,slots,readers,cond = state
+        self.__init__(width,height,channels,slots,readers,name)
+        self._cond = cond
+
+    @property
+    def width(self):
+        return self._width
+    @property
+    def height(self):
+        return self._height
+    @property
+    def channels(self):
+        return self._channels
+    @property
+    def slots(self):
+        return self._slots
+    @property
+    def write_seq(self):
+        return int(self._header[_H_WRITE_SEQ])
+
+    # 生产者：取得下一帧的槽位直接写入（如cv2.resize的dst），写完调用commit发布
+    def acquire(self):
+        slot = self._next_seq % self._slots
+        self._slot_seq[slot] = _WRITING
+        return self._frames[slot]
+
+    # ts_ns为采集时间（time.monotonic_ns），origin为采集帧序号，处理后的帧沿用源帧的值
+    def commit(self,ts_ns:int = None,origin:int = None) -> int:
+        seq = self._next_seq
+        slot = seq % self._slots
+        if ts_ns == None:
+            ts_ns = time.monotonic_ns()
+        if origin == None:
+            origin = seq
+        self._slot_ts[slot] = ts_ns
+        self._slot_origin[slot] = origin
+        self._slot_seq[slot] = seq
+        self._header[_H_WRITE_SEQ] = seq
+        self._next_seq = seq + 1
+        with self._cond:
+            self._cond.notify_all()
+        return seq
+
+    def write(self,frame,ts_ns:int = None,origin:int = None) -> int:
+        np.copyto(self.acquire(),frame.reshape(self._height,self._width,self._channels))
+        return self.commit(ts_ns,origin)
+
+    # 消费者：分配一个读游标，游标记录该读者已读取的最后一帧序号；指定index时复用该游标（进程重启后重新订阅）
+    def reader(self,index:int = None) -> int:
+        with self._cond:
+            if index == None:
+                index = int(self._header[_H_READERS_USED])
+                self._header[_H_READERS_USED] = index + 1
+            if index >= self._readers:
+                raise ValueError("FrameRing读者数量超过{}".format(self._readers))
+            self._cursors[index] = self._header[_H_WRITE_SEQ]
+        return index
+
+    def cursor(self,reader:int) -> int:
+        return int(self._cursors[reader])
+
+    def view(self,seq:int):
+        if seq <= 0 or self._slot_seq[seq % self._slots] != seq:
+            return None
+        return self._frames[seq % self._slots]
+
+    def stamp(self,seq:int):
+        # 返回(源帧序号,采集时间)，槽位已被覆盖时返回None
+        slot = seq % self._slots
+        ret = (int(self._slot_origin[slot]),int(self._slot_ts[slot]))
+        if self._slot_seq[slot] != seq:
+            return None
+        return ret
+
+    def valid(self,seq:int) -> bool:
+        # 零拷贝视图使用完后检查是否已被生产者覆盖
+        return self._slot_seq[seq % self._slots] == seq
+
+    @property
+    def max_lag(self):
+        # 生产者可能正在写入最旧的槽位，读者最多落后slots-1帧
+        return self._slots - 1
+
+    def read(self,reader:int,max_lag:int = 1):
+        # 按顺序读取下一帧，落后超过max_lag帧时跳过旧帧；max_lag为1即只取最新帧
+        write_seq = int(self._header[_H_WRITE_SEQ])
+        cursor = int(self._cursors[reader])
+        if write_seq <= cursor:
+            return None,None
+        seq = max(cursor + 1,write_seq - min(max_lag,self.max_lag) + 1)
+        view = self.view(seq)
+        if view is None:
+            return None,None
+        self._cursors[reader] = seq
+        return seq,view
+
+    def wait_read(self,reader:int,max_lag:int = 1,timeout:float = 0.1):
+        seq,view = self.read(reader,max_lag)
+        if view is not None:
+            return seq,view
+        with self._cond:
+            if int(self._header[_H_WRITE_SEQ]) <= int(self._cursors[reader]):
+                self._cond.wait(timeout)
+        return self.read(reader,max_lag)
+
+    def close(self):
+        self._header = None
+        self._slot_seq = None
+        self._slot_ts = None
+        self._slot_origin = None
+        self._cursors = None
+        self._frames = None
+        self._shm.close()
+        # fork启动的子进程继承了创建者对象，只有创建进程负责释放共享内存
+        if self._owner == os.getpid():
+            self._shm.unlink()
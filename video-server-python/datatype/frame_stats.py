@@ -0,0 +1,74 @@
+import socket
+import time
+
+# 延迟分布区间上限（毫秒），最后一档为超过500ms
+_BUCKETS_MS = (5,10,17,33,50,100,200,500)
+
+
+class StageStats(object):
+    # 单个处理阶段的统计：从采集到该阶段拿到帧的延迟分布，以及该阶段丢弃的帧数
+    def __init__(self,name:str):
+        self._name = name
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.dropped = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.histogram = [0] * (len(_BUCKETS_MS) + 1)
+
+    def record(self,ts_ns:int,now_ns:int = None):
+        if now_ns == None:
+            now_ns = time.monotonic_ns()
+        latency = now_ns - ts_ns
+        self.count += 1
+        self.total_ns += latency
+        if latency > self.max_ns:
+            self.max_ns = latency
+        i = 0
+        while i < len(_BUCKETS_MS) and latency > _BUCKETS_MS[i] * 1000000:
+            i += 1
+        self.histogram[i] += 1
+
+    def drop(self,count:int = 1):
+        self.dropped += count
+
+    @property
+    def name(self):
+        return self._name
+
+    def report(self) -> str:
+        avg = 0
+        if self.count > 0:
+            avg = self.total_ns / self.count / 1000000
+        buckets = []
+        for i in range(len(_BUCKETS_MS)):
+            buckets.append("<{}:{}".format(_BUCKETS_MS[i],self.histogram[i]))
+        buckets.append(">{}:{}".format(_BUCKETS_MS[-1],self.histogram[-1]))
+        return "[{}] 帧数{} 丢弃{} 延迟平均{:.1f}ms 最大{:.1f}ms 分布(ms) {}".format(
+            self._name,self.count,self.dropped,avg,self.max_ns / 1000000," ".join(buckets))
+
+
+class StatsReporter(object):
+    # 定期通过UDP日志通道发送各阶段统计，发送后清零
+    def __init__(self,stages:tuple,interval:float = 10,log_udp_port:int = 41001):
+        self._stages = stages
+        self._interval = interval
+        self._log_udp_port = log_udp_port
+        self._last_report = time.monotonic()
+
+    def tick(self):
+        now = time.monotonic()
+        if now - self._last_report < self._interval:
+            return
+        self._last_report = now
+        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for stage in self._stages:
+                if stage.count == 0 and stage.dropped == 0:
+                    continue
+                udp_socket.sendto(stage.report().encode("utf-8"), ("127.0.0.1", self._log_udp_port))
+                stage.reset()
+        finally:
+            udp_socket.close()
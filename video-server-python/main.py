@@ -1,11 +1,14 @@
 import capture
 import controller
 import datatype.device as device
+import datatype.frame_bus as frame_bus
 import recognize
 import ui
 import sys
-import multiprocessing
 import time
+import socket
+import multiprocessing
+import multiprocessing.connection
 
 _Camera_Name = "USB Video"
 _Camera_Width = 1280
@@ -18,6 +21,16 @@ _Display_Width = 960
 _Display_Height = 540
 _Display_FPS = 60
 _Recognize_FPS = 30
+# 共享内存帧环槽位数，显示按顺序读取，允许落后的帧数不超过槽位数
+_Frame_Ring_Slots = 8
+# 子进程异常退出后重启的间隔（秒），连续失败时加倍，最长不超过_Restart_Max_Interval
+_Restart_Interval = 3
+_Restart_Max_Interval = 60
+# 连续异常退出超过该次数后不再重启（如摄像头不存在、配置错误）
+_Restart_Max_Failures = 5
+# 进程运行超过该时间（秒）后才退出的视为偶发错误，重新计算连续失败次数
+_Restart_Reset_Time = 60
+_Log_UDP_Port = 41001
 
 # _Camera_Name = "FaceTime高清摄像头（内建）"
 # _Camera_FPS = 30
@@ -32,44 +45,88 @@ def main():
     # dev_video = device.VideoDevice(name=_Camera_Name,width=_Camera_Width,height=_Camera_Height,fps=_Camera_FPS,index=1,pix_fmt="bgr0")
     dev_audio = device.AudioDevice(name=_Audio_Device_Name,sample_rate=44100,channels=2)
     dev_joystick = device.JoystickDevice(host="192.168.50.120",port=5000)
-    main_video_frame,capture_video_frame = multiprocessing.Pipe(False)
-    ui_display_video_frame = multiprocessing.Queue()
-    opencv_processed_video_frame = multiprocessing.Queue()
-    recognize_video_frame = multiprocessing.Queue(1)
-    frame_queues = (recognize_video_frame,ui_display_video_frame,opencv_processed_video_frame,)
+    # 采集进程直接发布到共享内存，界面和识别进程按各自的策略订阅，主进程不再转发帧
+    bus = frame_bus.FrameBus(_Display_Width,_Display_Height,3,_Frame_Ring_Slots)
+    bus.add_topic(frame_bus.TOPIC_CAPTURE,("display","recognize",))
+    bus.add_topic(frame_bus.TOPIC_PROCESSED,("display",))
     controller_action_queue = multiprocessing.Queue()
     opencv_processed_control_queue = multiprocessing.Queue()
     control_queues=(opencv_processed_control_queue,controller_action_queue,)
-    controller_process = multiprocessing.Process(target=controller.run, args=(dev_joystick,control_queues,))
-    controller_process.start()
-    ui_process = multiprocessing.Process(target=ui.run, args=(frame_queues,control_queues,dev_audio,_Display_Width,_Display_Height))
+    workers = dict()
+    workers["controller"] = (controller.run,(dev_joystick,control_queues,))
+    workers["recognize"] = (recognize.run,(bus,control_queues,_Display_Width,_Display_Height,_Recognize_FPS,))
+    workers["video"] = (capture.capture_video,(bus,dev_video,_Display_Width,_Display_Height,_Display_FPS,))
+    processes = dict()
+    processes["controller"] = _start(workers["controller"])
+    ui_process = multiprocessing.Process(target=ui.run, args=(bus,control_queues,dev_audio,_Display_Width,_Display_Height))
     ui_process.start()
-    recognize_process = multiprocessing.Process(target=recognize.run, args=(frame_queues,control_queues,_Display_Width,_Display_Height,_Recognize_FPS,))
-    recognize_process.start()
-    video_process = multiprocessing.Process(target=capture.capture_video, args=(capture_video_frame,dev_video,_Display_Width,_Display_Height,_Display_FPS,))
-    video_process.start()
+    processes["recognize"] = _start(workers["recognize"])
+    processes["video"] = _start(workers["video"])
     try:
-        while True:
-            if not ui_process.is_alive():
-                break
-            video_frame = main_video_frame.recv()
-            try:
-                ui_display_video_frame.put(video_frame,False,0)
-            except:
-                pass
-            try:
-                recognize_video_frame.put(video_frame,False,0)
-            except:
-                pass
-            time.sleep(0.001)
+        _supervise(ui_process,workers,processes)
         sys.exit(0)
     except:
         pass
     finally:
-        controller_process.kill()
-        video_process.kill()
-        recognize_process.kill()
+        for p in processes.values():
+            p.kill()
         ui_process.kill()
+        bus.close()
+
+def _start(worker):
+    p = multiprocessing.Process(target=worker[0], args=worker[1])
+    p.start()
+    return p
+
+def _log(msg):
+    # 通过界面的UDP日志通道报告，同时输出到控制台
+    print(msg)
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        udp_socket.sendto(msg.encode("utf-8"), ("127.0.0.1", _Log_UDP_Port))
+    except:
+        pass
+    finally:
+        udp_socket.close()
+
+def _supervise(ui_process,workers,processes):
+    # 主进程只监控子进程：界面退出时结束；其他进程正常结束不再重启，异常退出后按退避间隔重启，连续失败多次后停止重启
+    started = dict()
+    failures = dict()
+    restart_at = dict()
+    for name in processes:
+        started[name] = time.monotonic()
+        failures[name] = 0
+    while ui_process.is_alive():
+        sentinels = [ui_process.sentinel]
+        for p in processes.values():
+            if p.is_alive():
+                sentinels.append(p.sentinel)
+        multiprocessing.connection.wait(sentinels,_Restart_Interval)
+        now = time.monotonic()
+        for name in list(processes.keys()):
+            p = processes[name]
+            if p.is_alive():
+                continue
+            if name not in restart_at:
+                if p.exitcode == 0:
+                    _log("{}进程已结束".format(name))
+                    del processes[name]
+                    continue
+                if now - started[name] >= _Restart_Reset_Time:
+                    failures[name] = 0
+                failures[name] += 1
+                if failures[name] > _Restart_Max_Failures:
+                    _log("{}进程连续{}次异常退出（退出码{}），不再重启，请检查设备和配置后重新运行".format(name,_Restart_Max_Failures,p.exitcode))
+                    del processes[name]
+                    continue
+                delay = min(_Restart_Interval * 2 ** (failures[name] - 1),_Restart_Max_Interval)
+                _log("{}进程异常退出（退出码{}），{}秒后第{}次重启".format(name,p.exitcode,delay,failures[name]))
+                restart_at[name] = now + delay
+            if now >= restart_at[name]:
+                del restart_at[name]
+                processes[name] = _start(workers[name])
+                started[name] = time.monotonic()
 
 if __name__ == "__main__":
     multiprocessing.freeze_support() 
@@ -1,6 +1,7 @@
 import asyncio
-import multiprocessing
 import time
+import datatype.frame_bus as frame_bus
+import datatype.frame_stats as frame_stats
 
 class Frame(object):
     def __new__(cls, *args, **kwargs):
@@ -19,43 +20,75 @@ class Frame(object):
             self._height = height
             self._fps = fps
             self._last_set_frame_monotonic_ns = time.monotonic_ns()
+            # 当前识别帧的(采集帧序号,采集时间ns)
+            self._stamp = (0,time.monotonic_ns())
+            # 当前识别帧在共享内存中的帧序号，用于确认零拷贝视图没有被覆盖
+            self._seq = 0
+            self._subscription = None
+            self.read_stats = frame_stats.StageStats("识别取帧")
+            self.output_stats = frame_stats.StageStats("识别输出")
+            self._reporter = frame_stats.StatsReporter((self.read_stats,self.output_stats,))
 
-    def set_frame_nowait(self,data)->bool:
+    def set_frame_nowait(self,data,stamp = None,seq:int = 0)->bool:
         if time.monotonic_ns() - self._last_set_frame_monotonic_ns < 1000000000/self._fps:
             return False
+        if stamp == None:
+            stamp = (0,time.monotonic_ns())
         if not self._queue.empty():
+            # 识别处理不过来，上一帧还没取走就被替换
             self._queue.get_nowait()
+            self.read_stats.drop()
         try:
-            self._queue.put_nowait(data)
+            self._queue.put_nowait((data,stamp,seq))
             self._last_set_frame_monotonic_ns = time.monotonic_ns()
             return True
         except asyncio.QueueFull:
             return False
 
+    def _take(self,item):
+        self._stamp = item[1]
+        self._seq = item[2]
+        self.read_stats.record(self._stamp[1])
+        return item[0]
+
     async def get_frame(self):
-        return await self._queue.get()
+        return self._take(await self._queue.get())
 
     def get_frame_nowait(self):
         try:
-            return self._queue.get_nowait()
+            return self._take(self._queue.get_nowait())
         except asyncio.QueueEmpty:
             return None
     
-    async def loop_read(self,process_queue:multiprocessing.Queue):
-        data = None
+    async def loop_read(self,subscription:frame_bus.Subscription):
+        # 只取最新一帧，得到的是共享内存中的只读视图
+        self._subscription = subscription
         while True:
-            try:
-                while True:
-                    _data = process_queue.get_nowait()
-                    data = _data
-            except:
-                pass
-            if data == None:
-                await asyncio.sleep(0.01)
+            self._reporter.tick()
+            seq,data = subscription.poll()
+            if data is None:
+                await asyncio.sleep(0.005)
+                continue
+            stamp = subscription.stamp(seq)
+            if stamp == None:
+                self.read_stats.drop()
                 continue
-            if self.set_frame_nowait(data):
-                data == None
-            await asyncio.sleep(0.01)
+            self.set_frame_nowait(data,stamp,seq)
+            await asyncio.sleep(0.005)
+
+    def valid(self) -> bool:
+        # 识别帧是共享内存中的视图，处理过程中采集进程可能已经覆盖该槽位，匹配后和发布前需要确认
+        if self._subscription == None or self._seq == 0:
+            return True
+        return self._subscription.valid(self._seq)
+
+    @property
+    def stamp(self):
+        return self._stamp
+    @property
+    def timestamp(self):
+        # 当前识别帧的采集时间，与time.monotonic()同一时钟，单位秒
+        return self._stamp[1] / 1000000000
     @property
     def width(self):
         return self._width
@@ -1,18 +1,104 @@
 from recognize import frame
 from recognize.opencv.battle_shiny import BattleShiny
 from recognize.opencv.none_opencv import NoneOpenCV
+from recognize.opencv.opencv import load_configs
+from recognize.opencv import template
 
-_opencv_list = []
-_opencv_list.append("定点闪（A连点）")
+# 识别类型注册表：config.json中detector字段对应的实现类
+_detectors = dict()
+# 界面显示的识别名称 -> config.json中的配置，第一次使用时才读取
+_configs = None
 
-def opencv_list():
-	return _opencv_list
+def register(name:str,cls):
+	_detectors[name] = cls
+
+register("none",NoneOpenCV)
+register("battle_shiny",BattleShiny)
+
+def _number(value) -> bool:
+	return isinstance(value,(int,float)) and not isinstance(value,bool)
+
+def _non_negative_int(value) -> bool:
+	return isinstance(value,int) and not isinstance(value,bool) and value >= 0
+
+def _check(config:dict):
+	# 返回配置错误的原因，配置有效时返回None；只检查配置本身，不读取模板图片
+	detector = config.get("detector")
+	if detector not in _detectors:
+		return "未知的识别类型{}".format(detector)
+	color = config.get("color","gray")
+	if not template.valid_color(color):
+		return "不支持的颜色空间{}".format(color)
+	if not _number(config.get("threshold",0)):
+		return "threshold必须是数字"
+	margin = config.get("margin",10)
+	if not _non_negative_int(margin):
+		return "margin必须是非负整数"
+	area = config.get("area")
+	if area != None:
+		if not isinstance(area,dict):
+			return "area格式错误"
+		for key in ("x","y","width","height"):
+			if not _non_negative_int(area.get(key)):
+				return "area.{}必须是非负整数".format(key)
+	if "image" not in config:
+		if _detectors[detector].requires_template:
+			return "缺少模板图片image"
+		return None
+	if not isinstance(config["image"],str):
+		return "image必须是文件路径"
+	return None
 
+def _check_template(config:dict):
+	# 读取并缓存模板图片，切换识别时不再读取文件
+	try:
+		image = template.TemplateStore().template(config["image"],config.get("color","gray"))
+	except:
+		return "模板图片读取失败：{}".format(config["image"])
+	area = config.get("area")
+	margin = config.get("margin",10)
+	if area != None and (image.shape[0] > area["height"] + margin * 2 or image.shape[1] > area["width"] + margin * 2):
+		return "模板图片比识别区域大"
+	return None
+
+def _get_configs() -> dict:
+	global _configs
+	if _configs != None:
+		return _configs
+	_configs = dict()
+	try:
+		configs = load_configs()
+	except Exception as e:
+		print("识别配置读取失败：{}".format(e))
+		return _configs
+	for name,config in configs.items():
+		error = None
+		if not isinstance(config,dict):
+			error = "配置格式错误"
+		else:
+			error = _check(config)
+		if error != None:
+			print("忽略识别配置{}：{}".format(name,error))
+			continue
+		_configs[config.get("tag",name)] = config
+	return _configs
+
+def load():
+	# 识别进程启动时调用：预先读取全部模板图片，读取失败的配置不再使用
+	configs = _get_configs()
+	for tag in list(configs.keys()):
+		if "image" not in configs[tag]:
+			continue
+		error = _check_template(configs[tag])
+		if error != None:
+			print("忽略识别配置{}：{}".format(tag,error))
+			del configs[tag]
+
+def opencv_list():
+	return list(_get_configs().keys())
 
 def create_instance(tag,frame:frame.Frame,opencv_processed_video_frame,controller_action_queue,log_udp_port = 41001):
-	if tag == "定点闪（A连点）":
-		return BattleShiny(frame,opencv_processed_video_frame,controller_action_queue,log_udp_port)
-	else:
+	config = _get_configs().get(tag)
+	if config == None:
 		return NoneOpenCV(frame,opencv_processed_video_frame,controller_action_queue,log_udp_port)
-		
-
+	return _detectors[config["detector"]](frame,opencv_processed_video_frame,controller_action_queue,log_udp_port,config)
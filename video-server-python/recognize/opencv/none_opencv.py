@@ -1,20 +1,14 @@
-import numpy as np
 from recognize import frame
 from recognize.opencv.opencv import OpenCV
 
 
 class NoneOpenCV(OpenCV):
-    def __init__(self,frame:frame.Frame,opencv_processed_video_frame,controller_action_queue,log_udp_port):
-        super().__init__(frame,opencv_processed_video_frame,controller_action_queue,log_udp_port)
+    def __init__(self,frame:frame.Frame,opencv_processed_video_frame,controller_action_queue,log_udp_port,config:dict = None):
+        super().__init__(frame,opencv_processed_video_frame,controller_action_queue,log_udp_port,config)
         self._enable_send_action = False
 
     
     async def run(self):
         while True:
-            data = await self._frame.get_frame()
-            image = (
-                np
-                .frombuffer(data, np.uint8)
-                .reshape([self._frame.height, self._frame.width, 3])
-            )
-            self._opencv_processed_video_frame.put(image.tobytes(),False,0)
\ No newline at end of file
+            image = await self._frame.get_frame()
+            self.publish(image)
\ No newline at end of file
@@ -1,18 +1,84 @@
 import asyncio
+import cv2
+import numpy as np
+import json
 import multiprocessing
 import socket
+import datatype.frame_ring as frame_ring
 from controller.macro import Macro
 from recognize import frame
+from recognize.opencv import template
+
+_Config_Path = "resources/config.json"
+
+def load_configs() -> dict:
+    with open(_Config_Path,encoding="utf-8") as f:
+        return json.load(f)["recognize"]
+
+def load_config(name:str) -> dict:
+    return load_configs()[name]
 
 class OpenCV(object):
-    def __init__(self,frame:frame.Frame,opencv_processed_video_frame:multiprocessing.Queue,controller_action_queue:multiprocessing.Queue,log_udp_port = 41001):
+    # 使用match()的识别类型需要在配置中指定模板图片
+    requires_template = False
+
+    def __init__(self,frame:frame.Frame,opencv_processed_video_frame:frame_ring.FrameRing,controller_action_queue:multiprocessing.Queue,log_udp_port = 41001,config:dict = None):
         self._frame = frame
         self._opencv_processed_video_frame = opencv_processed_video_frame
         self._controller_action_queue = controller_action_queue
         self._log_udp_port = log_udp_port
         self._enable_send_action = True
+        # 模板参数来自resources/config.json，模板图片从共享缓存中取得
+        if config == None:
+            config = dict()
+        self._config = config
+        self._area = config.get("area")
+        self._margin = config.get("margin",10)
+        self._threshold = config.get("threshold",0.75)
+        self._color = config.get("color","gray")
+        self._template = None
+        if "image" in config:
+            self._template = template.TemplateStore().template(config["image"],self._color)
 
     
+    def publish(self,image) -> bool:
+        # 处理后的帧沿用源帧的采集时间和序号，界面可据此计算端到端延迟
+        # image可能是源帧的视图，复制到输出槽位后确认源帧没有被覆盖再发布，否则丢弃本帧
+        origin,ts = self._frame.stamp
+        ring = self._opencv_processed_video_frame
+        np.copyto(ring.acquire(),image.reshape(ring.height,ring.width,ring.channels))
+        if not self._frame.valid():
+            self._frame.output_stats.drop()
+            return False
+        ring.commit(ts,origin)
+        self._frame.output_stats.record(ts)
+        return True
+
+    def crop(self,image,area:dict,margin:int = 0):
+        # 按识别区域加边距裁剪（不复制），返回裁剪后的视图及其左上角在原图中的坐标
+        height,width = image.shape[:2]
+        x0 = max(area["x"] - margin,0)
+        y0 = max(area["y"] - margin,0)
+        x1 = min(area["x"] + area["width"] + margin,width)
+        y1 = min(area["y"] + area["height"] + margin,height)
+        return image[y0:y1,x0:x1],(x0,y0)
+
+    def match(self,image):
+        # 在识别区域内匹配模板，返回(匹配度,整帧中的匹配位置)，未配置区域时匹配整帧
+        offset = (0,0)
+        if self._area != None:
+            image,offset = self.crop(image,self._area,self._margin)
+        match = cv2.matchTemplate(template.convert(image,self._color), self._template, cv2.TM_CCOEFF_NORMED)
+        _,max_val,_,p = cv2.minMaxLoc(match)
+        return max_val,(p[0] + offset[0],p[1] + offset[1])
+
+    def matched(self,max_val:float,p) -> bool:
+        if max_val <= self._threshold:
+            return False
+        if self._area == None:
+            return True
+        return abs(p[0] - self._area["x"]) <= self._margin and abs(p[1] - self._area["y"]) <= self._margin
+
     def send_log(self,msg):
         udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         udp_socket.sendto(msg.encode("utf-8"), ("127.0.0.1", self._log_udp_port)) 
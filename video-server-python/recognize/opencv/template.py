@@ -0,0 +1,53 @@
+import cv2
+from PIL import ImageFont
+
+# 识别使用的颜色空间，采集帧为BGR
+_Color_Codes = {
+    "gray":cv2.COLOR_BGR2GRAY,
+    "hsv":cv2.COLOR_BGR2HSV,
+    "bgr":None,
+}
+
+def valid_color(color) -> bool:
+    return color in _Color_Codes
+
+def convert(image,color:str = "gray"):
+    code = _Color_Codes[color]
+    if code == None:
+        return image
+    return cv2.cvtColor(image,code)
+
+
+class TemplateStore(object):
+    # 识别进程内共享的模板缓存，模板按颜色空间预处理一次，切换识别时不再读取文件
+    def __new__(cls, *args, **kwargs):
+        if not hasattr(cls, '_instance'):
+            cls._instance = super(TemplateStore, cls).__new__(cls)
+        return cls._instance
+
+    _first = True
+
+    def __init__(self):
+        if TemplateStore._first:
+            TemplateStore._first = False
+            self._templates = dict()
+            self._fonts = dict()
+
+    def template(self,path:str,color:str = "gray"):
+        key = (path,color)
+        ret = self._templates.get(key)
+        if ret is None:
+            image = cv2.imread(path)
+            if image is None:
+                raise FileNotFoundError("模板图片读取失败：{}".format(path))
+            ret = convert(image,color)
+            self._templates[key] = ret
+        return ret
+
+    def font(self,path:str,size:int):
+        key = (path,size)
+        ret = self._fonts.get(key)
+        if ret == None:
+            ret = ImageFont.truetype(path, size, encoding="utf-8")
+            self._fonts[key] = ret
+        return ret
@@ -2,13 +2,14 @@
 import sys
 from PySide6 import QtWidgets
 from datatype.device import AudioDevice
+from datatype.frame_bus import FrameBus
 from ui.user_window import UserWindows
-def run(frame_queues,control_queues,dev:AudioDevice,video_with,video_height):
-    _show(frame_queues,control_queues,dev,video_with,video_height)
+def run(bus:FrameBus,control_queues,dev:AudioDevice,video_with,video_height):
+    _show(bus,control_queues,dev,video_with,video_height)
 
-def _show(frame_queues,control_queues,dev:AudioDevice,video_with,video_height):
+def _show(bus:FrameBus,control_queues,dev:AudioDevice,video_with,video_height):
     app = QtWidgets.QApplication()
-    _main_window = UserWindows(frame_queues,control_queues,dev,video_with,video_height)
+    _main_window = UserWindows(bus,control_queues,dev,video_with,video_height)
     app.installEventFilter(_main_window)
     _main_window.setupUi()
     _main_window.show()
@@ -5,21 +5,25 @@ from ui.log import LogThread
 from ui.ui_win import Ui_MainWindow
 from PySide6 import QtWidgets
 from datatype.device import AudioDevice
+import datatype.frame_bus as frame_bus
+import datatype.frame_stats as frame_stats
 from PySide6.QtCore import Slot,Qt,QEvent,QTimer
 from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtMultimedia import QAudioFormat,QAudioSource,QAudioSink,QMediaDevices
 from ui.video import VideoThread
 import time
 
+# 显示按顺序播放，落后超过3帧时丢弃旧帧追上最新画面
+_Display_Max_Lag = 3
+
 class UserWindows(QtWidgets.QMainWindow,Ui_MainWindow):
-    def __init__(self,frame_queues,control_queues,dev:AudioDevice,video_with,video_height):
+    def __init__(self,bus:frame_bus.FrameBus,control_queues,dev:AudioDevice,video_with,video_height):
         QtWidgets.QMainWindow.__init__(self)
         Ui_MainWindow.__init__(self)
         self._audio_device = dev
         self._video_with = video_with
         self._video_height = video_height
-        self._frame_queue = frame_queues[1]
-        self._processed_frame_queue = frame_queues[2]
+        self._bus = bus
         self._processed_control_queue = control_queues[0]
         self._controller_action_queue = control_queues[1]
         self._key_press_map = dict()
@@ -240,7 +244,9 @@ class UserWindows(QtWidgets.QMainWindow,Ui_MainWindow):
         self.pushButton.clicked.connect(self.button_click)
 
         self.th_video = VideoThread(self)
-        self.th_video.set_input(self._video_with,self._video_height,3,QImage.Format_BGR888,self._frame_queue)
+        stats = frame_stats.StageStats("画面显示")
+        self.th_video.set_input(self._video_with,self._video_height,3,QImage.Format_BGR888,
+            self._bus.subscribe(frame_bus.TOPIC_CAPTURE,"display",frame_bus.BOUNDED,_Display_Max_Lag,stats),stats)
         self.th_video.video_frame.connect(self.setImage2)
         self.th_video.start()
 
@@ -250,7 +256,9 @@ class UserWindows(QtWidgets.QMainWindow,Ui_MainWindow):
         self.th_log.start()
         
         self.th_processed = VideoThread(self)
-        self.th_processed.set_input(self._video_with,self._video_height,3,QImage.Format_BGR888,self._processed_frame_queue)
+        stats = frame_stats.StageStats("识别画面显示")
+        self.th_processed.set_input(self._video_with,self._video_height,3,QImage.Format_BGR888,
+            self._bus.subscribe(frame_bus.TOPIC_PROCESSED,"display",frame_bus.BOUNDED,_Display_Max_Lag,stats),stats)
         self.th_processed.video_frame.connect(self.setImage1)
         self.th_processed.start()
         self.play_audio()
@@ -325,7 +333,6 @@ class UserWindows(QtWidgets.QMainWindow,Ui_MainWindow):
         if self._audio_input != None:
             self._audio_input.stop()
         self._m_audioSink.stop()
-        self._frame_queue.close()
     
 
     @Slot()
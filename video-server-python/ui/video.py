@@ -1,6 +1,7 @@
 
 from PySide6.QtCore import QThread,Signal
 from PySide6.QtGui import QImage
+import datatype.frame_stats as frame_stats
 
 
 class VideoThread(QThread):
@@ -8,16 +9,33 @@ class VideoThread(QThread):
     def __init__(self, parent=None):
         QThread.__init__(self, parent)
 
-    def set_input(self,width,height,channels,format,queue):
+    def set_input(self,width,height,channels,format,subscription,stats:frame_stats.StageStats = None):
         self._width = width
         self._height = height
         self._channels = channels
         self._format = format
-        self._queue = queue
+        self._subscription = subscription
+        self._stats = stats
         
     def run(self):
+        if self._subscription == None:
+            return
+        reporter = None
+        if self._stats != None:
+            reporter = frame_stats.StatsReporter((self._stats,))
         while True:
-            if self._queue != None :
-                frame = self._queue.get()
-                img = QImage(frame, self._width, self._height, self._channels*self._width,self._format)
-                self.video_frame.emit(img)
\ No newline at end of file
+            seq,frame = self._subscription.wait()
+            if reporter != None:
+                reporter.tick()
+            if frame is None:
+                continue
+            # QImage引用共享内存，复制后再交给界面线程，避免显示前被生产者覆盖
+            img = QImage(frame.data, self._width, self._height, self._channels*self._width,self._format).copy()
+            stamp = self._subscription.stamp(seq)
+            if stamp == None:
+                if self._stats != None:
+                    self._stats.drop()
+                continue
+            if self._stats != None:
+                self._stats.record(stamp[1])
+            self.video_frame.emit(img)
\ No newline at end of file